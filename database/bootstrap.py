@@ -0,0 +1,41 @@
+import logging
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from models.User import User
+from utils.config import settings
+from utils.pass_crypt import hash_password
+
+logger = logging.getLogger(__name__)
+
+
+def has_admin(db: Session) -> bool:
+    return db.query(User.id).filter(User.role == 'admin').first() is not None
+
+
+def create_first_admin(engine: Engine, read_engine: Engine | None = None) -> bool:
+    # safe to run from every worker at once, returns whether this call created the admin
+    if not settings.first_admin_username or not settings.first_admin_password:
+        return False
+    # once the admin exists every boot ends here, on a read connection that never waits for the write lock
+    with Session(read_engine or engine) as db:
+        if has_admin(db):
+            return False
+    # hashed before the write transaction, bcrypt would otherwise hold the write lock for its whole run
+    password = hash_password(settings.first_admin_password)
+    with Session(engine) as db:
+        # sqlite starts this transaction with BEGIN IMMEDIATE, so workers booting together take turns here and
+        # the ones after the first find its admin
+        if has_admin(db):
+            return False
+        db.add(User(username=settings.first_admin_username, password=password, role='admin'))
+        try:
+            db.commit()
+        except IntegrityError:
+            # a worker racing this one on another database got there first, or a regular user has the name
+            db.rollback()
+            logger.warning("first admin %r not created, the username is already taken", settings.first_admin_username)
+            return False
+    return True
@@ -1,10 +1,59 @@
-from contextlib import contextmanager
-
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlmodel import create_engine, SQLModel, Session
-from utils.constants import database_url
+from utils.config import settings
+from utils.metrics import track_queries
+
+
+def set_sqlite_pragmas(engine: Engine, read_only: bool):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # take transaction control away from pysqlite so the begin hook below decides how transactions start
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(conn):
+        # writers take the write lock up front and wait on busy_timeout, instead of failing with
+        # "database is locked" when a deferred read transaction has to be upgraded
+        conn.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+
+def create_db_engine(url: str, read_only: bool = False) -> Engine:
+    pool_size = settings.db_pool_size or settings.db_worker_threads
+    if not url.startswith("sqlite"):
+        engine = create_engine(url, pool_size=pool_size, max_overflow=settings.db_max_overflow, pool_pre_ping=True)
+    else:
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            pool_size=pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+        set_sqlite_pragmas(engine, read_only)
+    if settings.metrics_enabled:
+        track_queries(engine)
+    return engine
 
 
-engine = create_engine(database_url)
+engine = create_db_engine(settings.database_url)
+
+if settings.database_read_url:
+    read_engine = create_db_engine(settings.database_read_url, read_only=True)
+elif settings.sqlite_read_pool and settings.database_url.startswith("sqlite"):
+    read_engine = create_db_engine(settings.database_url, read_only=True)
+else:
+    read_engine = engine
 
 
 def get_db():
@@ -12,4 +61,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    db = Session(read_engine)
+    try:
+        yield db
+    finally:
+        db.close()
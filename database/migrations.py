@@ -0,0 +1,230 @@
+import calendar
+import datetime
+import logging
+
+from sqlalchemy import Table, bindparam, insert, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+from models.bugs import Bug
+from models.effects import Effect
+from models.suggestions import Suggestion
+from models.tombstones import Tombstone
+from models.User import User
+# create_all has to know every table the migrations touch
+from models import days, news, summaries, tombstones  # noqa: F401
+
+from utils.day_aggregates import rebuild_day_aggregates
+from utils.date_utils import utcnow
+from utils.month_summaries import rebuild_month_summaries
+from utils.search import create_fts_indexes
+
+logger = logging.getLogger(__name__)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(row.name == column for row in conn.execute(text(f"PRAGMA table_info({table})")))
+
+
+# a day's date as yyyy-mm-dd, whether the row is still in the old dd/mm/yyyy format or not
+iso_date_sql = ("CASE WHEN date LIKE '__/__/____' THEN substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || "
+                "substr(date, 1, 2) ELSE date END")
+
+
+def repaired_date(value: str) -> str | None:
+    # the old api only matched dates against a regex, so a 31/02 moves back to the last day of its month
+    try:
+        year, month, day = (int(part) for part in value.split("-"))
+        return datetime.date(year, month, max(1, min(day, calendar.monthrange(year, month)[1]))).isoformat()
+    except (ValueError, calendar.IllegalMonthError):
+        return None
+
+
+def merge_days(conn: Connection, keep_id: int, drop_ids: list[int]):
+    # the effects of the dropped days move to the kept one, clients that synced the dropped ids are told they are gone
+    drop = bindparam("drop", expanding=True)
+    moved = "foreign_key = :keep, updated_at = CURRENT_TIMESTAMP" if has_column(conn, "effect", "updated_at") else "foreign_key = :keep"
+    conn.execute(text(f"UPDATE effect SET {moved} WHERE foreign_key IN :drop").bindparams(drop), {"keep": keep_id, "drop": drop_ids})
+    conn.execute(insert(Tombstone), [
+        {"owner": row.owner, "kind": "day", "record_id": row.id, "deleted_at": utcnow()}
+        for row in conn.execute(text("SELECT id, owner FROM day WHERE id IN :drop").bindparams(drop), {"drop": drop_ids})
+    ])
+    conn.execute(text("DELETE FROM day WHERE id IN :drop").bindparams(drop), {"drop": drop_ids})
+
+
+def repair_day_dates(conn: Connection) -> int:
+    # with a modifier sqlite's date() rolls 2024-02-31 over into march, so a value it does not give back unchanged is no
+    # calendar day; python has no year 0 either
+    rows = conn.execute(text(
+        f"SELECT id, owner, date, {iso_date_sql} AS iso FROM day "
+        f"WHERE date({iso_date_sql}, '+0 days') IS NOT {iso_date_sql} OR {iso_date_sql} LIKE '0000-%'"
+    )).all()
+    broken = []
+    for row in rows:
+        date = repaired_date(row.iso)
+        if date is None:
+            broken.append(row)
+            continue
+        existing = conn.execute(text(f"SELECT id FROM day WHERE owner = :owner AND id != :id AND {iso_date_sql} = :date"),
+                                {"owner": row.owner, "id": row.id, "date": date}).scalar()
+        if existing is None:
+            conn.execute(text("UPDATE day SET date = :date WHERE id = :id"), {"date": date, "id": row.id})
+        else:
+            merge_days(conn, existing, [row.id])
+        logger.warning("day %s of user %s had the date %r, moved to %s", row.id, row.owner, row.date, date)
+    if broken:
+        raise RuntimeError("these days have dates that cannot be read, fix or delete them and run the migration again: "
+                           + ", ".join(f"day {row.id} of user {row.owner} ({row.date!r})" for row in broken))
+    return len(rows)
+
+
+def iso_day_dates(conn: Connection):
+    repair_day_dates(conn)
+    conn.execute(text(
+        "UPDATE day SET date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2) "
+        "WHERE date LIKE '__/__/____'"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_day_owner_date ON day (owner, date)"))
+
+
+def merge_duplicate_days(conn: Connection):
+    # the old create checked for the date and inserted in two steps, so two requests at once could both insert it;
+    # the first day of a date stays and takes over the effects of the others
+    duplicates = conn.execute(text(
+        "SELECT owner, date, min(id) AS keep_id, group_concat(id) AS ids FROM day GROUP BY owner, date HAVING count(*) > 1"
+    )).all()
+    for row in duplicates:
+        drop_ids = [int(day_id) for day_id in row.ids.split(",") if int(day_id) != row.keep_id]
+        merge_days(conn, row.keep_id, drop_ids)
+        logger.warning("user %s had %s days on %s, merged days %s into day %s",
+                       row.owner, len(drop_ids) + 1, row.date, drop_ids, row.keep_id)
+
+
+def per_user_indexes(conn: Connection):
+    merge_duplicate_days(conn)
+    conn.execute(text("DROP INDEX IF EXISTS ix_day_owner_date"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_day_owner_date ON day (owner, date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_effect_owner_foreign_key ON effect (owner, foreign_key)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_effect_owner_rate ON effect (owner, rate)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bug_user_id ON bug (user_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_suggestion_user_id ON suggestion (user_id)"))
+
+
+def day_effect_aggregates(conn: Connection):
+    for column in ("effect_count", "effect_rate_sum"):
+        if not has_column(conn, "day", column):
+            conn.execute(text(f"ALTER TABLE day ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"))
+    rebuild_day_aggregates(conn)
+
+
+def sync_tracking(conn: Connection):
+    for table in ("day", "effect"):
+        if not has_column(conn, table, "updated_at"):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'"))
+            conn.execute(text(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_owner_updated_at ON {table} (owner, updated_at)"))
+
+
+def full_text_search(conn: Connection):
+    create_fts_indexes(conn)
+
+
+def month_summaries(conn: Connection):
+    # the table itself comes from create_all, this fills it from the days already stored
+    rebuild_month_summaries(conn)
+
+
+def rebuild_table(conn: Connection, table: Table, parent: str, parent_column: str):
+    # sqlite cannot add a foreign key to an existing table, so the table is created again from the model and
+    # the rows whose parent still exists are copied over; dropping the old table drops its indexes and triggers
+    columns = ", ".join(column.name for column in table.columns)
+    conn.execute(text(str(CreateTable(table).compile(conn)).replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {table.name}_new ", 1)))
+    conn.execute(text(
+        f"INSERT INTO {table.name}_new ({columns}) SELECT {columns} FROM {table.name} "
+        f"WHERE {parent_column} IN (SELECT id FROM {parent})"
+    ))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {table.name}_new RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def cascading_foreign_keys(conn: Connection):
+    rebuild_table(conn, Effect.__table__, "day", "foreign_key")
+    rebuild_table(conn, Bug.__table__, '"user"', "user_id")
+    rebuild_table(conn, Suggestion.__table__, '"user"', "user_id")
+    # the fts triggers went with the old tables and rows of missing parents are gone, both come back from a rebuild
+    create_fts_indexes(conn)
+
+
+def valid_day_dates(conn: Connection):
+    # databases that went through iso_day_dates before it checked the calendar can hold dates like 2024-02-31
+    if repair_day_dates(conn):
+        rebuild_day_aggregates(conn)
+        rebuild_month_summaries(conn)
+
+
+def user_autoincrement(conn: Connection):
+    # sqlite only takes AUTOINCREMENT in CREATE TABLE. the rename carries the foreign keys of bug and suggestion over
+    # to user_old, so both are rebuilt against the new table before the old one is dropped
+    conn.execute(text('ALTER TABLE "user" RENAME TO user_old'))
+    conn.execute(CreateTable(User.__table__))
+    columns = ", ".join(column.name for column in User.__table__.columns)
+    conn.execute(text(f'INSERT INTO "user" ({columns}) SELECT {columns} FROM user_old'))
+    rebuild_table(conn, Bug.__table__, '"user"', "user_id")
+    rebuild_table(conn, Suggestion.__table__, '"user"', "user_id")
+    conn.execute(text("DROP TABLE user_old"))
+    for index in User.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    create_fts_indexes(conn)
+
+
+# applied in order, the position in this list (starting at 1) is the schema version stored in PRAGMA user_version
+migrations = [
+    iso_day_dates,
+    per_user_indexes,
+    day_effect_aggregates,
+    sync_tracking,
+    full_text_search,
+    month_summaries,
+    cascading_foreign_keys,
+    valid_day_dates,
+    user_autoincrement,
+]
+
+
+latest_version = len(migrations)
+
+
+def run_migrations(engine: Engine):
+    # the version is read inside the write transaction, a second migrate started at the same time waits for the
+    # first one and then finds nothing left to do
+    with engine.begin() as conn:
+        version = conn.execute(text("PRAGMA user_version")).scalar()
+        for number, migration in enumerate(migrations[version:], start=version + 1):
+            migration(conn)
+            conn.execute(text(f"PRAGMA user_version = {number}"))
+
+
+def schema_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(engine: Engine) -> tuple[int, int]:
+    # tables missing from the database are created from the models, the migrations bring existing ones up to date
+    before = schema_version(engine)
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    return before, schema_version(engine)
+
+
+def verify_schema(engine: Engine):
+    version = schema_version(engine)
+    if version < latest_version:
+        raise RuntimeError(f"the schema of {engine.url!r} is at version {version} and this release needs {latest_version}, "
+                           f"run `python -m scripts.migrate` before starting the app")
+    if version > latest_version:
+        raise RuntimeError(f"the schema of {engine.url!r} is at version {version}, newer than this release "
+                           f"({latest_version}), the app is older than the database it points at")
@@ -0,0 +1,80 @@
+import hashlib
+from bisect import bisect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from database.database import create_db_engine, engine, read_engine
+from utils.config import settings
+
+
+def ring_point(key: str) -> int:
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], "big")
+
+
+class ShardRouter:
+    # days, effects, month summaries and tombstones of a user live in one shard, picked from user.id on a hash ring;
+    # users, news, bugs and suggestions stay in the main database
+    def __init__(self, urls: list[str], virtual_nodes: int = settings.shard_virtual_nodes):
+        self.urls = urls
+        self.engines = []
+        self.read_engines = []
+        for url in urls:
+            if url == settings.database_url:
+                self.engines.append(engine)
+                self.read_engines.append(read_engine)
+                continue
+            shard_engine = create_db_engine(url)
+            self.engines.append(shard_engine)
+            if settings.sqlite_read_pool and url.startswith("sqlite"):
+                self.read_engines.append(create_db_engine(url, read_only=True))
+            else:
+                self.read_engines.append(shard_engine)
+        # the points are hashed from the url, not the position in the list, so adding a shard only moves the users
+        # that land on its points; changing a shard's url moves its users like removing and adding it would
+        ring = sorted((ring_point(f"{url}#{node}"), index) for index, url in enumerate(urls) for node in range(virtual_nodes))
+        self.points = [point for point, _ in ring]
+        self.shards = [index for _, index in ring]
+        # threads are only started on the first fan out
+        self.pool = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="shard") if len(urls) > 1 else None
+
+    def shard_for(self, owner: int) -> int:
+        if len(self.engines) == 1:
+            return 0
+        return self.shards[bisect(self.points, ring_point(str(owner))) % len(self.points)]
+
+    def engine_for(self, owner: int) -> Engine:
+        return self.engines[self.shard_for(owner)]
+
+    def read_engine_for(self, owner: int) -> Engine:
+        return self.read_engines[self.shard_for(owner)]
+
+    @contextmanager
+    def session_for(self, owner: int, db: Session, read: bool = False):
+        # db is a session on the main database, it is handed back when the owner's shard is the main database itself
+        # so one request never holds two write transactions on the same file
+        shard_engine = self.read_engine_for(owner) if read else self.engine_for(owner)
+        if shard_engine is db.get_bind():
+            yield db
+        else:
+            with Session(shard_engine) as shard_db:
+                yield shard_db
+
+    def database_engines(self) -> list[Engine]:
+        # the main database and every shard, the main database is listed once when it is also a shard
+        return list(dict.fromkeys([engine, *self.engines]))
+
+    def fan_out(self, work) -> list:
+        # runs work(session) on every shard at the same time, the results come back in shard order
+        def run(shard_engine):
+            with Session(shard_engine) as db:
+                return work(db)
+
+        if self.pool is None:
+            return [run(self.read_engines[0])]
+        return list(self.pool.map(run, self.read_engines))
+
+
+shard_router = ShardRouter(settings.shard_urls or [settings.database_url])
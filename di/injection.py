@@ -1,12 +1,20 @@
-from database.database import get_db
+from database.database import get_db, get_read_db
 from typing import Annotated
 from fastapi import Depends
 from sqlmodel import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from utils.constants import oauth2bearer
+from utils.moderation import ModerationParams, moderation_params
+from utils.pagination import PageParams, page_params
 
 db_dependency = Annotated[Session, Depends(get_db)]
 
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+
 token_dependency = Annotated[str, Depends(oauth2bearer)]
 
-form_data_injection = Annotated[OAuth2PasswordRequestForm, Depends()]
\ No newline at end of file
+form_data_injection = Annotated[OAuth2PasswordRequestForm, Depends()]
+
+page_dependency = Annotated[PageParams, Depends(page_params)]
+
+moderation_dependency = Annotated[ModerationParams, Depends(moderation_params)]
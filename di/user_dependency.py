@@ -1,7 +1,26 @@
 from typing import Annotated
 
 from fastapi import Depends
+from sqlmodel import Session
 
+from database.shards import shard_router
+from di.injection import db_dependency, read_db_dependency
 from utils.auth_utils import get_current_user
 
-user_dependency = Annotated[dict, Depends(get_current_user)]
\ No newline at end of file
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+# sessions on the shard that holds the current user's days and effects, the main database is still db_dependency
+def get_user_db(user: user_dependency, db: db_dependency):
+    with shard_router.session_for(user.get('id'), db) as user_db:
+        yield user_db
+
+
+def get_user_read_db(user: user_dependency, db: read_db_dependency):
+    with shard_router.session_for(user.get('id'), db, read=True) as user_db:
+        yield user_db
+
+
+user_db_dependency = Annotated[Session, Depends(get_user_db)]
+
+user_read_db_dependency = Annotated[Session, Depends(get_user_read_db)]
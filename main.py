@@ -1,10 +1,10 @@
-from typing import Annotated
-
-from fastapi import FastAPI, Depends
-from sqlmodel import SQLModel, Session
-from utils.pass_crypt import bcrypt_context
-from database.database import engine, get_db
-from models.User import User
+from anyio import to_thread
+from fastapi import FastAPI
+from utils.pass_crypt import shutdown_hash_pool
+from database.bootstrap import create_first_admin
+from database.database import engine, read_engine
+from database.migrations import migrate, verify_schema
+from database.shards import shard_router
 from routes.effects import router as effects_router
 from routes.days import router as days_router
 from routes.auth import router as auth_router
@@ -13,30 +13,42 @@ from routes.admin import admin_news_router, admin_bugs_router, admin_suggestions
 from routes.bugs import router as bugs_router
 from routes.suggestions import router as suggestion_routes
 from routes.users import router as user_router
+from routes.sync import router as sync_router
+from routes.metrics import router as metrics_router
+from utils.config import settings
+from utils.metrics import MetricsMiddleware
+from utils.responses import FastJSONResponse
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
-import os
-from dotenv import load_dotenv
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
-app = FastAPI()
 
-load_dotenv()
+@app.on_event("startup")
+def check_schema():
+    # migrations run once per deploy through `python -m scripts.migrate`, not in every worker that boots
+    for database_engine in shard_router.database_engines():
+        if settings.auto_migrate:
+            migrate(database_engine)
+        else:
+            verify_schema(database_engine)
 
 
 @app.on_event("startup")
-def on_startup():
-    SQLModel.metadata.create_all(engine)
+async def limit_db_threads():
+    # every route is a sync def, so fastapi runs it (and its blocking db calls) in this pool
+    to_thread.current_default_thread_limiter().total_tokens = settings.db_worker_threads
 
 
 @app.on_event("startup")
-def create_first_admin():
-    db = next(get_db())
-    admin = db.query(User).filter(User.role == 'admin').first()
-    if not admin:
-        first_admin_username = os.getenv("FIRST-ADMIN-USERNAME")
-        first_admin_password = os.getenv("FIRST-ADMIN-PASSWORD")
-        user_admin = User(username=first_admin_username, password=bcrypt_context.hash(first_admin_password), role='admin')
-        db.add(user_admin)
-        db.commit()
+def bootstrap_admin():
+    create_first_admin(engine, read_engine)
+
+
+@app.on_event("shutdown")
+def stop_hash_pool():
+    shutdown_hash_pool()
 
 
 app.include_router(effects_router)
@@ -50,6 +62,8 @@ app.include_router(admin_bugs_router)
 app.include_router(admin_suggestions_router)
 app.include_router(admin_users_router)
 app.include_router(user_router)
+app.include_router(sync_router)
+app.include_router(metrics_router)
 
 
 # TODO: for running the app publicly in all the devices on the network do ipconfig
@@ -3,6 +3,9 @@ from pydantic import BaseModel, Field as pyField
 
 
 class User(SQLModel, table = True):
+    # ids of deleted users are never handed out again, days and effects in the shards only refer to their owner by id
+    __table_args__ = {"sqlite_autoincrement": True}
+
     id: int = Field(default=None, primary_key=True, index=True)
     username: str = Field(unique=True, default=None)
     password: str
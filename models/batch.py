@@ -0,0 +1,9 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "deleted", "conflict", "not_found", "missing_day"]
+    id: Optional[int] = None
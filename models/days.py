@@ -1,20 +1,32 @@
+import datetime
+import re
 from typing import Optional
-from pydantic import BaseModel, Field as pyField
-from sqlmodel import Field, SQLModel, ForeignKey
+from pydantic import BaseModel, Field as pyField, field_validator
+from sqlmodel import Field, SQLModel, Index
 from models.effects import Effect
 
 from utils.constants import date_regex_pattern
+from utils.date_utils import parse_date, utcnow
 
 
 class Day(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_day_owner_date", "owner", "date", unique=True),
+        Index("ix_day_owner_updated_at", "owner", "updated_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
-    date: str = Field(default=None)
+    date: datetime.date = Field(default=None)
     red: int
     green: int
     blue: int
     rate: int
     auto_rate: bool
-    owner: int = Field(ForeignKey("user.id"))
+    # no foreign key to user: a large account is deleted in chunks of days before its user row goes
+    owner: int
+    effect_count: int = Field(default=0)
+    effect_rate_sum: int = Field(default=0)
+    updated_at: datetime.datetime = Field(default_factory=utcnow, sa_column_kwargs={"onupdate": utcnow})
 
 
 class UpdateDayRequest(BaseModel):
@@ -25,14 +37,25 @@ class UpdateDayRequest(BaseModel):
     auto_rate: Optional[bool] = pyField(default=False)
 
 
+class BatchUpdateDayRequest(UpdateDayRequest):
+    id: int = pyField(gt=0)
+
+
 class CreateDayRequest(BaseModel):
-    date: str = pyField(pattern=date_regex_pattern)
+    date: datetime.date
     red: int = pyField(gt=-1, lt=256)
     green: int = pyField(gt=-1, lt=256)
     blue: int = pyField(gt=-1, lt=256)
     rate: int = pyField(gt=-1, lt=5)
     auto_rate: bool = pyField(default=False)
 
+    @field_validator("date", mode="before")
+    @classmethod
+    def parse_legacy_date(cls, value):
+        if isinstance(value, str) and re.match(date_regex_pattern, value):
+            return parse_date(value)
+        return value
+
 
 class DaysEffectsModel(BaseModel):
     day: Day
@@ -1,18 +1,29 @@
+import datetime
 from typing import Optional
 
-from sqlmodel import SQLModel, Field, ForeignKey
+from sqlmodel import SQLModel, Field, Index
 from pydantic import BaseModel, Field as pyField
 
 from utils.constants import time_regex_pattern
+from utils.date_utils import utcnow
 
 
 class Effect(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_effect_owner_foreign_key", "owner", "foreign_key"),
+        Index("ix_effect_owner_rate", "owner", "rate"),
+        Index("ix_effect_owner_updated_at", "owner", "updated_at"),
+        # the ON DELETE CASCADE from day looks effects up by foreign_key alone
+        Index("ix_effect_foreign_key", "foreign_key"),
+    )
+
     id: int = Field(default=None, primary_key=True, index=True)
     time: str
     rate: int
     description: str
-    foreign_key: int = Field(ForeignKey("day.id"))
-    owner: int = Field(ForeignKey("user.id"))
+    foreign_key: int = Field(foreign_key="day.id", ondelete="CASCADE")
+    owner: int
+    updated_at: datetime.datetime = Field(default_factory=utcnow, sa_column_kwargs={"onupdate": utcnow})
 
 
 class CreateEffectRequest(BaseModel):
@@ -24,5 +35,9 @@ class CreateEffectRequest(BaseModel):
 
 class UpdateEffectRequest(BaseModel):
     time: Optional[str] = pyField(default=None, pattern=time_regex_pattern)
-    rate: Optional[int] = pyField(gt=-1, lt=5)
-    description: Optional[str] = pyField(min_length=5, max_length=100)
\ No newline at end of file
+    rate: int = pyField(gt=-1, lt=5)
+    description: Optional[str] = pyField(min_length=5, max_length=100)
+
+
+class BatchUpdateEffectRequest(UpdateEffectRequest):
+    id: int = pyField(gt=0)
@@ -1,11 +1,11 @@
-from sqlmodel import SQLModel, Field, ForeignKey
+from sqlmodel import SQLModel, Field
 from pydantic import BaseModel, Field as pyField
 
 
 class Suggestion(SQLModel, table=True):
     id: int = Field(default=None, primary_key=True, index=True)
     username: str
-    user_id: int = Field(ForeignKey("user.id"))
+    user_id: int = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
     description: str
     approved: bool = Field(default=False)
     done: bool = Field(default=False)
@@ -0,0 +1,13 @@
+from sqlmodel import SQLModel, Field
+
+
+class MonthSummary(SQLModel, table=True):
+    owner: int = Field(primary_key=True)
+    period: str = Field(primary_key=True)
+    day_count: int = Field(default=0)
+    rate_sum: int = Field(default=0)
+    red_sum: int = Field(default=0)
+    green_sum: int = Field(default=0)
+    blue_sum: int = Field(default=0)
+    effect_count: int = Field(default=0)
+    effect_rate_sum: int = Field(default=0)
@@ -0,0 +1,14 @@
+import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field, Index
+
+
+class Tombstone(SQLModel, table=True):
+    __table_args__ = (Index("ix_tombstone_owner_deleted_at", "owner", "deleted_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner: int
+    kind: str
+    record_id: int
+    deleted_at: datetime.datetime
@@ -1,12 +1,30 @@
-from fastapi import APIRouter, HTTPException, Body, Path
+from fastapi import APIRouter, HTTPException, Body, Path, Query, Response
 from starlette import status
 from sqlmodel import func
-from di.injection import db_dependency
+from di.injection import db_dependency, read_db_dependency, page_dependency, moderation_dependency
+from database.shards import shard_router
 from di.user_dependency import user_dependency
+from models.days import Day
+from models.effects import Effect
 from models.User import User
+from models.batch import BatchItemResult
 from models.bugs import Bug
 from models.news import NewsRequest, News
 from models.suggestions import Suggestion
+from models.tombstones import Tombstone
+from utils.auth_utils import revoke_user_tokens
+from utils.constants import batch_size_limit
+from utils.deletion import delete_days_in_chunks
+from utils.http_cache import bump_user_version, invalidate_news
+from utils.moderation import filter_reports, report_counts, update_reports, delete_reports, batch_results
+from utils.pagination import model_columns, paginate, row_to_dict
+from utils.responses import json_response
+from utils.search import match_expression, search_matches, ranked_search
+
+bug_columns = model_columns(Bug)
+bug_dict = row_to_dict(bug_columns)
+suggestion_columns = model_columns(Suggestion)
+suggestion_dict = row_to_dict(suggestion_columns)
 
 admin_news_router = APIRouter(
     prefix="/admin/news",
@@ -15,7 +33,7 @@ admin_news_router = APIRouter(
 
 
 @admin_news_router.post("", status_code=status.HTTP_201_CREATED)
-async def add_news(db: db_dependency, user: user_dependency, created_news: NewsRequest = Body()):
+def add_news(db: db_dependency, user: user_dependency, created_news: NewsRequest = Body()):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
@@ -23,29 +41,30 @@ async def add_news(db: db_dependency, user: user_dependency, created_news: NewsR
     news = News(**created_news.model_dump())
     db.add(news)
     db.commit()
+    invalidate_news()
 
 
 @admin_news_router.delete("", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_all_news(db: db_dependency, user: user_dependency):
+def delete_all_news(db: db_dependency, user: user_dependency):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
     db.query(News).delete(synchronize_session=False)
     db.commit()
+    invalidate_news()
 
 
 @admin_news_router.delete("/{news_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_news_by_id(db: db_dependency, user: user_dependency, news_id: int = Path(gt=0)):
+def delete_news_by_id(db: db_dependency, user: user_dependency, news_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    news = db.query(News).filter(News.id == news_id).first()
-    if not news:
+    if not db.query(News).filter(News.id == news_id).delete(synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News Not Found")
-    db.query(News).filter(News.id == news_id).delete()
     db.commit()
+    invalidate_news()
 
 
 admin_bugs_router = APIRouter(
@@ -54,18 +73,77 @@ admin_bugs_router = APIRouter(
 )
 
 
-@admin_bugs_router.get("", status_code=status.HTTP_200_OK)
-async def get_all_bugs(db: db_dependency, user: user_dependency):
+@admin_bugs_router.get("", status_code=status.HTTP_200_OK, response_model=list[Bug])
+def get_all_bugs(db: read_db_dependency, user: user_dependency, page: page_dependency, filters: moderation_dependency,
+                 response: Response):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    bugs = db.query(Bug).all()
-    return bugs
+    query = filter_reports(db.query(*bug_columns), Bug, filters)
+    reports = paginate(db, query, Bug.id, page, response, bug_dict)
+    return reports if page.stream else json_response(reports, response)
+
+
+@admin_bugs_router.get("/counts", status_code=status.HTTP_200_OK)
+def get_bug_counts(db: read_db_dependency, user: user_dependency, filters: moderation_dependency):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    return report_counts(db, Bug, filters)
+
+
+@admin_bugs_router.get("/search", status_code=status.HTTP_200_OK)
+def search_bugs(db: read_db_dependency, user: user_dependency, page: page_dependency, response: Response,
+                q: str = Query(min_length=1, max_length=100)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    expression = match_expression(q)
+    if expression is None:
+        return []
+    matches = search_matches(Bug, expression).subquery()
+    query = db.query(Bug).join(matches, matches.c.id == Bug.id).order_by(matches.c.rank, Bug.id)
+    return ranked_search(db, query, page, response)
+
+
+@admin_bugs_router.put("/batch/approve", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def approve_bugs_batch(db: db_dependency, user: user_dependency, bug_ids: list[int] = Body(max_length=batch_size_limit)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    approved = update_reports(db, Bug, bug_ids, approved=True)
+    db.commit()
+    return batch_results(bug_ids, approved, "updated")
+
+
+@admin_bugs_router.put("/batch/done", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def set_bugs_done_batch(db: db_dependency, user: user_dependency, bug_ids: list[int] = Body(max_length=batch_size_limit)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    done = update_reports(db, Bug, bug_ids, done=True)
+    db.commit()
+    return batch_results(bug_ids, done, "updated")
+
+
+@admin_bugs_router.delete("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def delete_bugs_batch(db: db_dependency, user: user_dependency, bug_ids: list[int] = Body(max_length=batch_size_limit)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    deleted = delete_reports(db, Bug, bug_ids)
+    db.commit()
+    return batch_results(bug_ids, deleted, "deleted")
 
 
 @admin_bugs_router.get("/{bug_id}", status_code=status.HTTP_200_OK)
-async def get_bug_by_id(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
+def get_bug_by_id(db: read_db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
@@ -77,57 +155,46 @@ async def get_bug_by_id(db: db_dependency, user: user_dependency, bug_id: int =
 
 
 @admin_bugs_router.put("/approve/{bug_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def approve_bug(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
+def approve_bug(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    bug = db.query(Bug).filter(Bug.id == bug_id).first()
-    if not bug:
+    if not db.query(Bug).filter(Bug.id == bug_id).update({Bug.approved: True}, synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bug report not found")
-    bug.approved = True
-    db.add(bug)
     db.commit()
 
 
 @admin_bugs_router.put("/done/{bug_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def set_bug_done(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
+def set_bug_done(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    bug = db.query(Bug).filter(Bug.id == bug_id).first()
-    if not bug:
+    if not db.query(Bug).filter(Bug.id == bug_id).update({Bug.done: True}, synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bug report not found")
-    bug.done = True
-    db.add(bug)
     db.commit()
 
 
 @admin_bugs_router.put("/link/{bug_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def set_bug_issue_link(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0), link: str = Body()):
+def set_bug_issue_link(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0), link: str = Body()):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    bug = db.query(Bug).filter(Bug.id == bug_id).first()
-    if not bug:
+    if not db.query(Bug).filter(Bug.id == bug_id).update({Bug.issue_link: link}, synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bug report not found")
-    bug.issue_link = link
-    db.add(bug)
     db.commit()
 
 
 @admin_bugs_router.delete("/{bug_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_bug_by_id(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
+def delete_bug_by_id(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    bug = db.query(Bug).filter(Bug.id == bug_id).first()
-    if not bug:
+    if not db.query(Bug).filter(Bug.id == bug_id).delete(synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bug report not found")
-    db.query(Bug).filter(Bug.id == bug_id).delete()
     db.commit()
 
 
@@ -137,18 +204,77 @@ admin_suggestions_router = APIRouter(
 )
 
 
-@admin_suggestions_router.get("", status_code=status.HTTP_200_OK)
-async def get_all_suggestions(db: db_dependency, user: user_dependency):
+@admin_suggestions_router.get("", status_code=status.HTTP_200_OK, response_model=list[Suggestion])
+def get_all_suggestions(db: read_db_dependency, user: user_dependency, page: page_dependency, filters: moderation_dependency,
+                        response: Response):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    suggestion = db.query(Suggestion).all()
-    return suggestion
+    query = filter_reports(db.query(*suggestion_columns), Suggestion, filters)
+    reports = paginate(db, query, Suggestion.id, page, response, suggestion_dict)
+    return reports if page.stream else json_response(reports, response)
+
+
+@admin_suggestions_router.get("/counts", status_code=status.HTTP_200_OK)
+def get_suggestion_counts(db: read_db_dependency, user: user_dependency, filters: moderation_dependency):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    return report_counts(db, Suggestion, filters)
+
+
+@admin_suggestions_router.get("/search", status_code=status.HTTP_200_OK)
+def search_suggestions(db: read_db_dependency, user: user_dependency, page: page_dependency, response: Response,
+                       q: str = Query(min_length=1, max_length=100)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    expression = match_expression(q)
+    if expression is None:
+        return []
+    matches = search_matches(Suggestion, expression).subquery()
+    query = db.query(Suggestion).join(matches, matches.c.id == Suggestion.id).order_by(matches.c.rank, Suggestion.id)
+    return ranked_search(db, query, page, response)
+
+
+@admin_suggestions_router.put("/batch/approve", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def approve_suggestions_batch(db: db_dependency, user: user_dependency, suggestion_ids: list[int] = Body(max_length=batch_size_limit)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    approved = update_reports(db, Suggestion, suggestion_ids, approved=True)
+    db.commit()
+    return batch_results(suggestion_ids, approved, "updated")
+
+
+@admin_suggestions_router.put("/batch/done", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def set_suggestions_done_batch(db: db_dependency, user: user_dependency, suggestion_ids: list[int] = Body(max_length=batch_size_limit)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    done = update_reports(db, Suggestion, suggestion_ids, done=True)
+    db.commit()
+    return batch_results(suggestion_ids, done, "updated")
+
+
+@admin_suggestions_router.delete("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def delete_suggestions_batch(db: db_dependency, user: user_dependency, suggestion_ids: list[int] = Body(max_length=batch_size_limit)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    deleted = delete_reports(db, Suggestion, suggestion_ids)
+    db.commit()
+    return batch_results(suggestion_ids, deleted, "deleted")
 
 
 @admin_suggestions_router.get("/{suggestion_id}", status_code=status.HTTP_200_OK)
-async def get_suggestion_by_id(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
+def get_suggestion_by_id(db: read_db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
@@ -160,57 +286,46 @@ async def get_suggestion_by_id(db: db_dependency, user: user_dependency, suggest
 
 
 @admin_suggestions_router.put("/approve/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def approve_suggestion(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
+def approve_suggestion(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    suggestion = db.query(Suggestion).filter(Suggestion.id == suggestion_id).first()
-    if not suggestion:
+    if not db.query(Suggestion).filter(Suggestion.id == suggestion_id).update({Suggestion.approved: True}, synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Suggestion not found")
-    suggestion.approved = True
-    db.add(suggestion)
     db.commit()
 
 
 @admin_suggestions_router.put("/done/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def set_suggestion_done(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
+def set_suggestion_done(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    suggestion = db.query(Suggestion).filter(Suggestion.id == suggestion_id).first()
-    if not suggestion:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Suggestion found")
-    suggestion.done = True
-    db.add(suggestion)
+    if not db.query(Suggestion).filter(Suggestion.id == suggestion_id).update({Suggestion.done: True}, synchronize_session=False):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Suggestion not found")
     db.commit()
 
 
 @admin_suggestions_router.put("/link/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def set_suggestion_issue_link(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0), link: str = Body()):
+def set_suggestion_issue_link(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0), link: str = Body()):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    suggestion = db.query(Suggestion).filter(Suggestion.id == suggestion_id).first()
-    if not suggestion:
+    if not db.query(Suggestion).filter(Suggestion.id == suggestion_id).update({Suggestion.issue_link: link}, synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Suggestion not found")
-    suggestion.issue_link = link
-    db.add(suggestion)
     db.commit()
 
 
 @admin_suggestions_router.delete("/{suggestion_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_suggestion_by_id(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
+def delete_suggestion_by_id(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    suggestion = db.query(Suggestion).filter(Suggestion.id == suggestion_id).first()
-    if not suggestion:
+    if not db.query(Suggestion).filter(Suggestion.id == suggestion_id).delete(synchronize_session=False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Suggestion not found")
-    db.query(Suggestion).filter(Suggestion.id == suggestion_id).delete()
     db.commit()
 
 
@@ -221,17 +336,32 @@ admin_users_router = APIRouter(
 
 
 @admin_users_router.get("", status_code=status.HTTP_200_OK)
-async def get_all_users(db: db_dependency, user: user_dependency):
+def get_all_users(db: read_db_dependency, user: user_dependency, page: page_dependency, response: Response):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
-    users = db.query(User.id, User.username, User.role).all()
-    return [{"id": user.id, "username": user.username, 'role': user.role} for user in users]
+    query = db.query(User.id, User.username, User.role)
+    return paginate(db, query, User.id, page, response, lambda row: {"id": row.id, "username": row.username, 'role': row.role})
+
+
+def shard_counts(db) -> dict:
+    users, days = db.query(func.count(func.distinct(Day.owner)), func.count(Day.id)).one()
+    return {"users": users, "days": days, "effects": db.query(func.count(Effect.id)).scalar()}
+
+
+@admin_users_router.get("/shards", status_code=status.HTTP_200_OK)
+def get_shard_counts(user: user_dependency):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    # users with at least one day, counted on every shard at once
+    return [{"shard": shard, **counts} for shard, counts in enumerate(shard_router.fan_out(shard_counts))]
 
 
 @admin_users_router.get("/{user_id}", status_code=status.HTTP_200_OK)
-async def get_user_by_id(db: db_dependency, user: user_dependency, user_id: int = Path(gt=0)):
+def get_user_by_id(db: read_db_dependency, user: user_dependency, user_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
@@ -243,7 +373,7 @@ async def get_user_by_id(db: db_dependency, user: user_dependency, user_id: int
 
 
 @admin_users_router.put("/toggle-admin/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def toggle_user_admin(db: db_dependency, user: user_dependency, user_id: int = Path(gt=0)):
+def toggle_user_admin(db: db_dependency, user: user_dependency, user_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     if user.get('role') != "admin":
@@ -260,4 +390,27 @@ async def toggle_user_admin(db: db_dependency, user: user_dependency, user_id: i
     elif user_role.role == 'user':
         user.role = 'admin'
         db.add(user)
-        db.commit()
\ No newline at end of file
+        db.commit()
+
+
+@admin_users_router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_user(db: db_dependency, user: user_dependency, user_id: int = Path(gt=0)):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    user_role = db.query(User.role).filter(User.id == user_id).first()
+    if not user_role:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if user_role.role == 'admin' and db.query(func.count(User.id)).filter(User.role == 'admin').scalar() <= 1:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail="There has to be at least one admin")
+    with shard_router.session_for(user_id, db) as user_db:
+        delete_days_in_chunks(user_db, user_id)
+        # nobody is left to sync the tombstones
+        user_db.query(Tombstone).filter(Tombstone.owner == user_id).delete(synchronize_session=False)
+        user_db.commit()
+    # bugs and suggestions go with the user row through ON DELETE CASCADE
+    db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+    db.commit()
+    bump_user_version(user_id)
+    revoke_user_tokens(user_id)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Path
 from starlette import status
 
-from di.injection import db_dependency
+from di.injection import db_dependency, read_db_dependency
 from di.user_dependency import user_dependency
 from models.bugs import Bug, BugRequest
 
@@ -12,7 +12,7 @@ router = APIRouter(
 
 
 @router.get("", status_code=status.HTTP_200_OK)
-async def get_all_bugs(db: db_dependency, user: user_dependency):
+def get_all_bugs(db: read_db_dependency, user: user_dependency):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     bugs = db.query(Bug).filter(Bug.user_id == user.get('id')).all()
@@ -20,7 +20,7 @@ async def get_all_bugs(db: db_dependency, user: user_dependency):
 
 
 @router.get("/{bug_id}", status_code=status.HTTP_200_OK)
-async def get_bug_by_id(db: db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
+def get_bug_by_id(db: read_db_dependency, user: user_dependency, bug_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     bug = db.query(Bug).filter(Bug.user_id == user.get('id')).filter(Bug.id == bug_id).first()
@@ -30,9 +30,9 @@ async def get_bug_by_id(db: db_dependency, user: user_dependency, bug_id: int =
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-async def create_bug(db: db_dependency, user: user_dependency, created_bug: BugRequest):
+def create_bug(db: db_dependency, user: user_dependency, created_bug: BugRequest):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    bug = Bug(**created_bug.model_dump(), user_id=user.get('id'), username=user.get('sub'))
+    bug = Bug(**created_bug.model_dump(), user_id=user.get('id'), username=user.get('username'))
     db.add(bug)
     db.commit()
\ No newline at end of file
@@ -1,42 +1,201 @@
+import datetime
 from typing import Annotated
 
-from di.user_dependency import user_dependency
-from models.days import Day, CreateDayRequest, UpdateDayRequest, DaysOverviewModel, DaysEffectsModel
-from fastapi import APIRouter, Path, Query, HTTPException, Depends
+from di.user_dependency import user_dependency, user_db_dependency, user_read_db_dependency
+from models.batch import BatchItemResult
+from models.days import Day, CreateDayRequest, UpdateDayRequest, DaysOverviewModel, BatchUpdateDayRequest
+from fastapi import APIRouter, Path, Query, HTTPException, Depends, Request, Response, Body
 from starlette import status
-from di.injection import db_dependency
+from di.injection import page_dependency
 from models.effects import Effect
+from models.summaries import MonthSummary
 from utils.auth_utils import get_current_user
-from utils.constants import date_regex_pattern
+from utils.constants import date_regex_pattern, month_regex_pattern, batch_size_limit, overview_days_limit
+from utils.date_utils import parse_date
+from utils.day_aggregates import day_average
+from utils.deletion import delete_days, delete_days_in_chunks
+from utils.http_cache import bump_user_version, cached_user_response
+from utils.month_summaries import add_days_to_months, month_summary
+from utils.overview import days_overview_json
+from utils.pagination import model_columns, paginate, row_to_dict
+from utils.responses import json_response
+from utils.search import owner_match_expression, search_matches, ranked_search
+from utils.stats import mood_stats
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import func, join, outerjoin
 
 router = APIRouter(prefix="/days", tags=["Day Routes"])
 
+day_columns = model_columns(Day)
+day_dict = row_to_dict(day_columns)
+
 
 @router.post("/new", status_code=status.HTTP_201_CREATED)
-async def create_day(day: CreateDayRequest, db: db_dependency, user: user_dependency):
+def create_day(day: CreateDayRequest, db: user_db_dependency, user: user_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     new_day = Day(**day.model_dump(exclude={"owner"}), owner=user.get('id'))
-    existing_day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.date == new_day.date).first()
-    if existing_day:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Day already exists!")
     db.add(new_day)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Day already exists!")
+    add_days_to_months(db, db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == new_day.id))
     db.commit()
+    bump_user_version(user.get('id'))
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def create_days_batch(db: user_db_dependency, user: user_dependency, days: list[CreateDayRequest] = Body(max_length=batch_size_limit)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    taken_dates = {
+        row.date for row in
+        db.query(Day.date).filter(Day.owner == user.get('id')).filter(Day.date.in_({day.date for day in days}))
+    }
+    results = []
+    new_days = []
+    for index, day in enumerate(days):
+        if day.date in taken_dates:
+            results.append(BatchItemResult(index=index, status="conflict"))
+            continue
+        taken_dates.add(day.date)
+        results.append(BatchItemResult(index=index, status="created"))
+        new_days.append({**day.model_dump(), "owner": user.get('id')})
+    if new_days:
+        try:
+            new_ids = db.scalars(insert(Day).returning(Day.id, sort_by_parameter_order=True), new_days).all()
+            add_days_to_months(db, db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id.in_(new_ids)))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Days were created concurrently, retry the batch")
+        bump_user_version(user.get('id'))
+        for result, new_id in zip((result for result in results if result.status == "created"), new_ids):
+            result.id = new_id
+    return results
+
+
+@router.put("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def update_days_batch(db: user_db_dependency, user: user_dependency, days: list[BatchUpdateDayRequest] = Body(max_length=batch_size_limit)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    owned_ids = {
+        row.id for row in db.query(Day.id).filter(Day.owner == user.get('id')).filter(Day.id.in_({day.id for day in days}))
+    }
+    updates = [day.model_dump() for day in days if day.id in owned_ids]
+    if updates:
+        updated_days = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id.in_(owned_ids))
+        add_days_to_months(db, updated_days, -1)
+        db.execute(update(Day), updates)
+        add_days_to_months(db, updated_days)
+        db.commit()
+        bump_user_version(user.get('id'))
+    return [
+        BatchItemResult(index=index, status="updated" if day.id in owned_ids else "not_found", id=day.id)
+        for index, day in enumerate(days)
+    ]
+
+
+@router.delete("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def delete_days_batch(db: user_db_dependency, user: user_dependency, days_id: list[int] = Body(max_length=batch_size_limit)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    owned_ids = {
+        row.id for row in db.query(Day.id).filter(Day.owner == user.get('id')).filter(Day.id.in_(set(days_id)))
+    }
+    if owned_ids:
+        delete_days(db, user.get('id'), db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id.in_(owned_ids)))
+        db.commit()
+        bump_user_version(user.get('id'))
+    return [
+        BatchItemResult(index=index, status="deleted" if day_id in owned_ids else "not_found", id=day_id)
+        for index, day_id in enumerate(days_id)
+    ]
 
 
 @router.get("/date", status_code=status.HTTP_200_OK)
-async def get_day_by_date(db: db_dependency, user: user_dependency, date: str = Query(regex=date_regex_pattern)):
+def get_day_by_date(db: user_read_db_dependency, user: user_dependency, date: str = Query(pattern=date_regex_pattern)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.date == date).first()
+    try:
+        day_date = parse_date(date)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="The provided date does not exist")
+    day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.date == day_date).first()
     if not day:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day with the provided date is not found!")
     return day
 
 
+@router.get("/range", status_code=status.HTTP_200_OK, response_model=list[Day])
+def get_days_in_range(db: user_read_db_dependency, user: user_dependency, start: datetime.date = Query(), end: datetime.date = Query()):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    query = (
+        db.query(*day_columns)
+        .filter(Day.owner == user.get('id'))
+        .filter(Day.date.between(start, end))
+        .order_by(Day.date)
+    )
+    return json_response([day_dict(row) for row in query])
+
+
+@router.get("/months", status_code=status.HTTP_200_OK)
+def get_month_summaries(db: user_read_db_dependency, user: user_dependency,
+                        start: str | None = Query(default=None, pattern=month_regex_pattern),
+                        end: str | None = Query(default=None, pattern=month_regex_pattern)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    query = db.query(MonthSummary).filter(MonthSummary.owner == user.get('id'))
+    if start:
+        query = query.filter(MonthSummary.period >= start)
+    if end:
+        query = query.filter(MonthSummary.period <= end)
+    return [month_summary(row) for row in query.order_by(MonthSummary.period)]
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK)
+def get_days_stats(db: user_read_db_dependency, user: user_dependency, request: Request,
+                   rolling_days: int = Query(default=90, gt=0, le=3660)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    return cached_user_response(user.get('id'), request, f"stats:{rolling_days}",
+                                lambda: (mood_stats(db, user.get('id'), rolling_days), {}))
+
+
+@router.get("/search", status_code=status.HTTP_200_OK)
+def search_days(db: user_read_db_dependency, user: user_dependency, page: page_dependency, response: Response,
+                q: str = Query(min_length=1, max_length=100)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    expression = owner_match_expression(user.get('id'), q)
+    if expression is None:
+        return []
+    # a day ranks by the best matching effect written on it, bm25 cannot run inside the aggregate so the matches are materialized
+    matches = search_matches(Effect, expression).cte().prefix_with("MATERIALIZED")
+    day_matches = (
+        select(Effect.foreign_key.label("day_id"), func.min(matches.c.rank).label("rank"))
+        .join(matches, matches.c.id == Effect.id)
+        .where(Effect.owner == user.get('id'))
+        .group_by(Effect.foreign_key)
+        .subquery()
+    )
+    query = (
+        db.query(Day)
+        .join(day_matches, day_matches.c.day_id == Day.id)
+        .filter(Day.owner == user.get('id'))
+        .order_by(day_matches.c.rank, Day.id)
+    )
+    return ranked_search(db, query, page, response)
+
+
 @router.get("/id/{day_id}", status_code=status.HTTP_200_OK)
-async def get_day_by_id(db: db_dependency, user: user_dependency, day_id: int = Path(gt=0)):
+def get_day_by_id(db: user_read_db_dependency, user: user_dependency, day_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == day_id).first()
@@ -46,93 +205,64 @@ async def get_day_by_id(db: db_dependency, user: user_dependency, day_id: int =
 
 
 @router.get("", status_code=status.HTTP_200_OK)
-async def get_all_days(db: db_dependency, user: user_dependency):
+def get_all_days(db: user_read_db_dependency, user: user_dependency, page: page_dependency, request: Request, response: Response):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    query = (
-        db.query(
-            Day,
-            (func.coalesce(func.sum(Effect.rate), 0) / func.coalesce(func.count(Effect.id), 1)).label("avg")
-        )
-        .outerjoin(Effect, Effect.foreign_key == Day.id)  # Use an outer join here
-        .filter(Day.owner == user.get('id'))
-        .group_by(Day.id)
-        .all()
-    )
-    result = [
-        {
-            "day": day,
-            "average": avg
-        }
-        for day, avg in query
-    ]
-    return result
+    query = db.query(*day_columns).filter(Day.owner == user.get('id'))
+    serialize = lambda row: {"day": day_dict(row), "average": day_average(row)}
+    if page.stream:
+        return paginate(db, query, Day.id, page, response, serialize)
+
+    def build():
+        page_response = Response()
+        days = paginate(db, query, Day.id, page, page_response, serialize)
+        return days, {key: value for key, value in page_response.headers.items() if key.startswith("x-")}
+
+    return cached_user_response(user.get('id'), request, f"days:{page.limit}:{page.cursor}", build)
 
 
 @router.put("/id/{day_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_day(user: user_dependency, db: db_dependency, updated_day: UpdateDayRequest, day_id: int = Path(gt=0)):
+def update_day(user: user_dependency, db: user_db_dependency, updated_day: UpdateDayRequest, day_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == day_id).first()
     if not day:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day not found")
+    changed_day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == day_id)
+    add_days_to_months(db, changed_day, -1)
     day.red = updated_day.red
     day.green = updated_day.green
     day.blue = updated_day.blue
     day.rate = updated_day.rate
     day.auto_rate = updated_day.auto_rate
     db.add(day)
+    db.flush()
+    add_days_to_months(db, changed_day)
     db.commit()
+    bump_user_version(user.get('id'))
 
 
-@router.get("/overview", status_code=status.HTTP_200_OK)
-async def get_days_overview(db: db_dependency, user: user_dependency, days_id: list[int] = Query()):
+@router.get("/overview", status_code=status.HTTP_200_OK, response_model=DaysOverviewModel)
+def get_days_overview(db: user_read_db_dependency, user: user_dependency,
+                      days_id: list[int] = Query(max_length=overview_days_limit)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    query = (
-        db.query(Day, Effect)
-        .outerjoin(Effect, Effect.foreign_key == Day.id)  # Outer join to include all days
-        .filter(Day.owner == user.get("id"))
-        .filter(Day.id.in_(days_id))
-        .all()
-    )
-
-    # Group effects by day
-    days_dict = {}
-    for day, effect in query:
-        if day.id not in days_dict:
-            days_dict[day.id] = {
-                "day": day,
-                "effects": []
-            }
-        if effect:
-            days_dict[day.id]["effects"].append(effect)
-
-    day_overview = [
-        DaysEffectsModel(day=data["day"], effects=data["effects"])
-        for data in days_dict.values()
-    ]
-
-    return DaysOverviewModel(data=day_overview)
+    # the json is put together by the database, the model above only documents it
+    return Response(days_overview_json(db, user.get("id"), set(days_id)), media_type="application/json")
 
 
 @router.delete("/id/{day_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_day_by_id(user: user_dependency, db: db_dependency, day_id: int = Path(gt=0)):
+def delete_day_by_id(user: user_dependency, db: user_db_dependency, day_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == day_id).first()
-    if not day:
+    if not delete_days(db, user.get('id'), db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == day_id)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day not found")
-    db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == day_id).delete()
-    db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.foreign_key == day_id).delete(
-        synchronize_session=False)
     db.commit()
+    bump_user_version(user.get('id'))
 
 
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_all_days(user: user_dependency, db: db_dependency):
+def delete_all_days(user: user_dependency, db: user_db_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    db.query(Day).filter(Day.owner == user.get('id')).delete(synchronize_session=False)
-    db.query(Effect).filter(Effect.owner == user.get('id')).delete(synchronize_session=False)
-    db.commit()
+    delete_days_in_chunks(db, user.get('id'), on_commit=lambda: bump_user_version(user.get('id')))
@@ -1,74 +1,203 @@
+from collections import defaultdict
 from typing import List, Annotated
-from fastapi import APIRouter, Query, Path, HTTPException, Depends
+from fastapi import APIRouter, Query, Path, HTTPException, Depends, Request, Response, Body
 from starlette import status
 
-from di.user_dependency import user_dependency
+from di.user_dependency import user_dependency, user_db_dependency, user_read_db_dependency
 from models.days import Day
-from models.effects import Effect, CreateEffectRequest, UpdateEffectRequest
-from di.injection import db_dependency
+from models.batch import BatchItemResult
+from models.effects import Effect, CreateEffectRequest, UpdateEffectRequest, BatchUpdateEffectRequest
+from di.injection import page_dependency
 from utils.auth_utils import get_current_user
+from utils.constants import batch_size_limit
+from utils.day_aggregates import add_effects_to_day, add_effect_totals, day_average
+from utils.http_cache import bump_user_version, check_user_etag, cached_user_response, user_json_response
+from utils.month_summaries import add_days_to_months, clear_months
+from utils.pagination import model_columns, paginate, row_to_dict
+from utils.responses import json_response
+from utils.search import owner_match_expression, search_matches, ranked_search
+from utils.tombstones import record_tombstones
+from sqlalchemy import insert, update
 from sqlmodel import func
 
 router = APIRouter(prefix="/effects", tags=["Effect Routes"])
 
+effect_columns = model_columns(Effect)
+effect_dict = row_to_dict(effect_columns)
 
-@router.get("", status_code=status.HTTP_200_OK)
-async def get_all_effects(user: user_dependency, db: db_dependency):
+
+@router.get("", status_code=status.HTTP_200_OK, response_model=list[Effect])
+def get_all_effects(user: user_dependency, db: user_read_db_dependency, page: page_dependency, request: Request, response: Response):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    return db.query(Effect).filter(Effect.owner == user.get('id')).all()
+    cached = check_user_etag(user.get('id'), request, response)
+    if cached:
+        return cached
+    query = db.query(*effect_columns).filter(Effect.owner == user.get('id'))
+    effects = paginate(db, query, Effect.id, page, response, effect_dict)
+    return effects if page.stream else user_json_response(request, effects, response)
 
 
 @router.post("/new", status_code=status.HTTP_201_CREATED)
-async def create_effect(user: user_dependency, db: db_dependency, effect: CreateEffectRequest):
+def create_effect(user: user_dependency, db: user_db_dependency, effect: CreateEffectRequest):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    day = db.query(Day).filter(Day.id == effect.foreign_key).filter(Day.owner == user.get('id')).first()
-    if not day:
+    if not add_effects_to_day(db, user.get('id'), effect.foreign_key, 1, effect.rate):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day with given id not found")
     new_effect = Effect(**effect.model_dump(exclude={"owner"}), owner=user.get('id'))
     db.add(new_effect)
     db.commit()
+    bump_user_version(user.get('id'))
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def create_effects_batch(user: user_dependency, db: user_db_dependency, effects: list[CreateEffectRequest] = Body(max_length=batch_size_limit)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    owned_days = {
+        row.id for row in
+        db.query(Day.id).filter(Day.owner == user.get('id')).filter(Day.id.in_({effect.foreign_key for effect in effects}))
+    }
+    results = []
+    new_effects = []
+    totals = defaultdict(lambda: [0, 0])
+    for index, effect in enumerate(effects):
+        if effect.foreign_key not in owned_days:
+            results.append(BatchItemResult(index=index, status="missing_day"))
+            continue
+        results.append(BatchItemResult(index=index, status="created"))
+        new_effects.append({**effect.model_dump(), "owner": user.get('id')})
+        totals[effect.foreign_key][0] += 1
+        totals[effect.foreign_key][1] += effect.rate
+    if new_effects:
+        new_ids = db.scalars(insert(Effect).returning(Effect.id, sort_by_parameter_order=True), new_effects).all()
+        add_effect_totals(db, user.get('id'), totals)
+        db.commit()
+        bump_user_version(user.get('id'))
+        for result, new_id in zip((result for result in results if result.status == "created"), new_ids):
+            result.id = new_id
+    return results
+
+
+@router.put("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def update_effects_batch(user: user_dependency, db: user_db_dependency, effects: list[BatchUpdateEffectRequest] = Body(max_length=batch_size_limit)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    current = {
+        row.id: row for row in
+        db.query(Effect.id, Effect.rate, Effect.foreign_key).filter(Effect.owner == user.get('id'))
+        .filter(Effect.id.in_({effect.id for effect in effects}))
+    }
+    totals = defaultdict(lambda: [0, 0])
+    updates = {}
+    for effect in effects:
+        if effect.id in current:
+            updates[effect.id] = effect.model_dump()
+    for effect_id, values in updates.items():
+        totals[current[effect_id].foreign_key][1] += values["rate"] - current[effect_id].rate
+    if updates:
+        db.execute(update(Effect), list(updates.values()))
+        add_effect_totals(db, user.get('id'), totals)
+        db.commit()
+        bump_user_version(user.get('id'))
+    return [
+        BatchItemResult(index=index, status="updated" if effect.id in current else "not_found", id=effect.id)
+        for index, effect in enumerate(effects)
+    ]
+
+
+@router.delete("/batch", status_code=status.HTTP_200_OK, response_model=list[BatchItemResult])
+def delete_effects_batch(user: user_dependency, db: user_db_dependency, effects_id: list[int] = Body(max_length=batch_size_limit)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    current = db.query(Effect.id, Effect.rate, Effect.foreign_key).filter(Effect.owner == user.get('id'))\
+        .filter(Effect.id.in_(set(effects_id))).all()
+    deleted_ids = {row.id for row in current}
+    if deleted_ids:
+        totals = defaultdict(lambda: [0, 0])
+        for row in current:
+            totals[row.foreign_key][0] -= 1
+            totals[row.foreign_key][1] -= row.rate
+        deleted_effects = db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.id.in_(deleted_ids))
+        record_tombstones(db, deleted_effects)
+        deleted_effects.delete(synchronize_session=False)
+        add_effect_totals(db, user.get('id'), totals)
+        db.commit()
+        bump_user_version(user.get('id'))
+    return [
+        BatchItemResult(index=index, status="deleted" if effect_id in deleted_ids else "not_found", id=effect_id)
+        for index, effect_id in enumerate(effects_id)
+    ]
 
 
 @router.get("/avg", status_code=status.HTTP_200_OK)
-async def get_day_avg(user: user_dependency, db: db_dependency, foreign_key: int = Query(gt=0)):
-    sum, count = db.query(func.sum(Effect.rate).label("sum"), func.count(Effect.id).label("count")).filter(Effect.owner == user.get('id'))\
-        .filter(Effect.foreign_key == foreign_key).one()
-    day_avg = sum/count
-    return day_avg
+def get_day_avg(user: user_dependency, db: user_read_db_dependency, request: Request, foreign_key: int = Query(gt=0)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    def build():
+        day = db.query(Day.effect_count, Day.effect_rate_sum).filter(Day.owner == user.get('id'))\
+            .filter(Day.id == foreign_key).first()
+        if not day:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day with given id not found")
+        return day_average(day), {}
 
+    return cached_user_response(user.get('id'), request, f"avg:{foreign_key}", build)
 
-@router.get("/foreign_key/{foreign_key}", status_code=status.HTTP_200_OK)
-async def get_effects_by_day(user: user_dependency, db: db_dependency, foreign_key: int = Path(gt=0)):
+
+@router.get("/foreign_key/{foreign_key}", status_code=status.HTTP_200_OK, response_model=list[Effect])
+def get_effects_by_day(user: user_dependency, db: user_read_db_dependency, foreign_key: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    return db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.foreign_key == foreign_key).all()
+    query = db.query(*effect_columns).filter(Effect.owner == user.get('id')).filter(Effect.foreign_key == foreign_key)
+    return json_response([effect_dict(row) for row in query])
 
 
-@router.post("/filter", status_code=status.HTTP_200_OK)
-async def query_effects(user: user_dependency, db: db_dependency, rate: List[int]):
+@router.post("/filter", status_code=status.HTTP_200_OK, response_model=list[Effect])
+def query_effects(user: user_dependency, db: user_read_db_dependency, rate: List[int], page: page_dependency, response: Response):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    return db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.rate.in_(rate)).all()
+    query = db.query(*effect_columns).filter(Effect.owner == user.get('id')).filter(Effect.rate.in_(rate))
+    effects = paginate(db, query, Effect.id, page, response, effect_dict)
+    return effects if page.stream else json_response(effects, response)
+
+
+@router.get("/search", status_code=status.HTTP_200_OK)
+def search_effects(user: user_dependency, db: user_read_db_dependency, page: page_dependency, response: Response,
+                   q: str = Query(min_length=1, max_length=100)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    expression = owner_match_expression(user.get('id'), q)
+    if expression is None:
+        return []
+    matches = search_matches(Effect, expression).subquery()
+    query = (
+        db.query(Effect)
+        .join(matches, matches.c.id == Effect.id)
+        .filter(Effect.owner == user.get('id'))
+        .order_by(matches.c.rank, Effect.id)
+    )
+    return ranked_search(db, query, page, response)
 
 
 @router.put("/id/{effect_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_effect(user: user_dependency, db: db_dependency, updated_effect: UpdateEffectRequest, effect_id: int = Path(gt=0)):
+def update_effect(user: user_dependency, db: user_db_dependency, updated_effect: UpdateEffectRequest, effect_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     effect = db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.id == effect_id).first()
     if not effect:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="effect not found")
+    add_effects_to_day(db, effect.owner, effect.foreign_key, 0, updated_effect.rate - effect.rate)
     effect.time = updated_effect.time
     effect.rate = updated_effect.rate
     effect.description = updated_effect.description
     db.add(effect)
     db.commit()
+    bump_user_version(user.get('id'))
 
 
 @router.get("/id/{effect_id}", status_code=status.HTTP_200_OK)
-async def get_effect_by_id(user: user_dependency, db: db_dependency, effect_id: int = Path(gt=0)):
+def get_effect_by_id(user: user_dependency, db: user_read_db_dependency, effect_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     effect = db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.id == effect_id).first()
@@ -78,27 +207,42 @@ async def get_effect_by_id(user: user_dependency, db: db_dependency, effect_id:
 
 
 @router.delete("/id/{effect_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_effect(user: user_dependency, db: db_dependency, effect_id: int = Path(gt=0)):
+def delete_effect(user: user_dependency, db: user_db_dependency, effect_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     effect_exists = db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.id == effect_id).first()
     if not effect_exists:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.id == effect_id).delete()
+    deleted_effect = db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.id == effect_id)
+    record_tombstones(db, deleted_effect)
+    deleted_effect.delete()
+    add_effects_to_day(db, effect_exists.owner, effect_exists.foreign_key, -1, -effect_exists.rate)
     db.commit()
+    bump_user_version(user.get('id'))
 
 
 @router.delete("/foreign_key/{foreign_key}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_day_effects(user: user_dependency, db: db_dependency, foreign_key: int = Path(gt=0)):
+def delete_day_effects(user: user_dependency, db: user_db_dependency, foreign_key: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.foreign_key == foreign_key).delete(synchronize_session=False)
+    deleted_effects = db.query(Effect).filter(Effect.owner == user.get('id')).filter(Effect.foreign_key == foreign_key)
+    record_tombstones(db, deleted_effects)
+    deleted_effects.delete(synchronize_session=False)
+    day = db.query(Day).filter(Day.owner == user.get('id')).filter(Day.id == foreign_key)
+    add_days_to_months(db, day, -1, days=False)
+    day.update({Day.effect_count: 0, Day.effect_rate_sum: 0}, synchronize_session=False)
     db.commit()
+    bump_user_version(user.get('id'))
 
 
 @router.delete("")
-async def delete_all_effects(user: user_dependency, db: db_dependency):
+def delete_all_effects(user: user_dependency, db: user_db_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    db.query(Effect).filter(Effect.owner == user.get('id')).delete(synchronize_session=False)
-    db.commit()
\ No newline at end of file
+    deleted_effects = db.query(Effect).filter(Effect.owner == user.get('id'))
+    record_tombstones(db, deleted_effects)
+    deleted_effects.delete(synchronize_session=False)
+    db.query(Day).filter(Day.owner == user.get('id')).update({Day.effect_count: 0, Day.effect_rate_sum: 0}, synchronize_session=False)
+    clear_months(db, user.get('id'), effects_only=True)
+    db.commit()
+    bump_user_version(user.get('id'))
\ No newline at end of file
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from starlette import status
+from di.user_dependency import user_dependency
+from utils.metrics import render_prometheus, metrics_summary
+
+router = APIRouter(
+    tags=['Metrics']
+)
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/admin/metrics", status_code=status.HTTP_200_OK)
+def get_metrics_summary(user: user_dependency):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if user.get('role') != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No Admin privileges")
+    return metrics_summary()
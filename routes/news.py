@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, HTTPException, Path, Request, Response
 from starlette import status
 
-from di.injection import db_dependency
+from di.injection import read_db_dependency, page_dependency
 from di.user_dependency import user_dependency
 from models.news import News
+from utils.http_cache import cached_news_response
+from utils.pagination import paginate
 
 router = APIRouter(
     prefix="/news",
@@ -12,18 +14,29 @@ router = APIRouter(
 
 
 @router.get("", status_code=status.HTTP_200_OK)
-async def get_all_news(db: db_dependency, user: user_dependency):
+def get_all_news(db: read_db_dependency, user: user_dependency, page: page_dependency, request: Request, response: Response):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    news = db.query(News).all()
-    return news
+    if page.stream:
+        return paginate(db, db.query(News), News.id, page, response)
+
+    def build():
+        page_response = Response()
+        news = paginate(db, db.query(News), News.id, page, page_response)
+        return news, {key: value for key, value in page_response.headers.items() if key.startswith("x-")}
+
+    return cached_news_response(request, f"list:{page.limit}:{page.cursor}", build)
 
 
 @router.get("/{news_id}", status_code=status.HTTP_200_OK, response_model=News)
-async def get_news_by_id(db: db_dependency, user: user_dependency, news_id: int = Path(gt=0)):
+def get_news_by_id(db: read_db_dependency, user: user_dependency, request: Request, news_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    news = db.query(News).filter(News.id == news_id).first()
-    if not news:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News Not Found")
-    return news
+
+    def build():
+        news = db.query(News).filter(News.id == news_id).first()
+        if not news:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="News Not Found")
+        return news, {}
+
+    return cached_news_response(request, f"id:{news_id}", build)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Path, Body, HTTPException
 from starlette import status
 
-from di.injection import db_dependency
+from di.injection import db_dependency, read_db_dependency
 from di.user_dependency import user_dependency
 from models.suggestions import Suggestion, SuggestionRequest
 
@@ -12,7 +12,7 @@ router = APIRouter(
 
 
 @router.get("", status_code=status.HTTP_200_OK)
-async def get_all_suggestions(db: db_dependency, user: user_dependency):
+def get_all_suggestions(db: read_db_dependency, user: user_dependency):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     suggestions = db.query(Suggestion).filter(Suggestion.user_id == user.get('id')).all()
@@ -20,7 +20,7 @@ async def get_all_suggestions(db: db_dependency, user: user_dependency):
 
 
 @router.get("/{suggestion_id", status_code=status.HTTP_200_OK)
-async def get_suggestion_by_id(db: db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
+def get_suggestion_by_id(db: read_db_dependency, user: user_dependency, suggestion_id: int = Path(gt=0)):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     suggestion = db.query(Suggestion).filter(Suggestion.user_id == user.get('id')).filter(Suggestion.id == suggestion_id).first()
@@ -30,9 +30,9 @@ async def get_suggestion_by_id(db: db_dependency, user: user_dependency, suggest
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-async def create_suggestion(db: db_dependency, user: user_dependency, created_suggestion: SuggestionRequest):
+def create_suggestion(db: db_dependency, user: user_dependency, created_suggestion: SuggestionRequest):
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    suggestion = Suggestion(**created_suggestion.model_dump(), username=user.get('sub'), user_id=user.get('id'))
+    suggestion = Suggestion(**created_suggestion.model_dump(), username=user.get('username'), user_id=user.get('id'))
     db.add(suggestion)
     db.commit()
\ No newline at end of file
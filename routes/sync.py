@@ -0,0 +1,89 @@
+import datetime
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from starlette import status
+
+from di.injection import page_dependency
+from di.user_dependency import user_dependency, user_read_db_dependency
+from models.days import Day
+from models.effects import Effect
+from models.tombstones import Tombstone
+from utils.config import settings
+from utils.date_utils import as_utc, utcnow
+from utils.pagination import PageParams, next_cursor_header, paginate
+from utils.responses import json_response
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+# the next cursor is moved back by this much so writes still committing while we read are picked up next time,
+# clients apply changes as upserts so seeing a row twice is harmless
+sync_overlap = datetime.timedelta(seconds=5)
+
+# rows per page of a sync, when the client sends no limit
+sync_page_size = 500
+
+# the cursor of an incremental page packs the table it stopped in with the last id it sent
+cursor_span = 10 ** 12
+
+# tables an incremental sync reads, in the order they are paged
+change_sources = [
+    (Day, Day.updated_at),
+    (Effect, Effect.updated_at),
+    (Tombstone, Tombstone.deleted_at),
+]
+
+
+def changes_page(db, owner: int, since: datetime.datetime, page: PageParams, response: Response) -> list[list]:
+    # days, then effects, then tombstones changed after since, each by id. rows changed while the client is paging get
+    # a newer timestamp than the first page's cursor, so the next sync picks up any the pages passed over
+    limit = page.limit or sync_page_size
+    start, after = divmod(page.cursor or 0, cursor_span)
+    pages = [[] for _ in change_sources]
+    for index, (model, changed_at) in enumerate(change_sources[start:], start=start):
+        query = db.query(model).filter(model.owner == owner).filter(changed_at > since)
+        if index == start and after:
+            query = query.filter(model.id > after)
+        rows = query.order_by(model.id).limit(limit + 1).all()
+        if len(rows) > limit:
+            # a page that filled up on the table before points at the start of this one
+            pages[index] = rows[:limit]
+            response.headers[next_cursor_header] = str(index * cursor_span + (rows[limit - 1].id if limit else 0))
+            break
+        pages[index] = rows
+        limit -= len(rows)
+    return pages
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+def get_changes(db: user_read_db_dependency, user: user_dependency, page: page_dependency, response: Response,
+                since: datetime.datetime | None = Query(default=None)):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    cursor = utcnow() - sync_overlap
+    # every sync comes in pages, X-Next-Cursor and has_more say another one follows. the cursor of the first page is
+    # the one to continue from with since once they are gone, later pages leave it out
+    if since is None:
+        # the first sync is every day with its effects
+        snapshot_page = PageParams(limit=page.limit or sync_page_size, cursor=page.cursor, stream=False)
+        days = paginate(db, db.query(Day).filter(Day.owner == user.get('id')), Day.id, snapshot_page, response)
+        effects = db.query(Effect).filter(Effect.owner == user.get('id'))\
+            .filter(Effect.foreign_key.in_([day.id for day in days])).order_by(Effect.id).all()
+        deleted = []
+    else:
+        since = as_utc(since)
+        if since < utcnow() - datetime.timedelta(days=settings.tombstone_retention_days):
+            # deletions older than this are pruned, a client this far behind would never hear about them
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="since is too old, sync again without it")
+        days, effects, deleted = changes_page(db, user.get('id'), since, page, response)
+    # deleting a day also deletes its effects, those are not listed separately in deleted_effects
+    return json_response({
+        "cursor": cursor if page.cursor is None else None,
+        "has_more": next_cursor_header in response.headers,
+        "days": days,
+        "effects": effects,
+        "deleted_days": [row.record_id for row in deleted if row.kind == "day"],
+        "deleted_effects": [row.record_id for row in deleted if row.kind == "effect"],
+    }, response)
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Query, File, UploadFile
+from fastapi.responses import StreamingResponse
 from models.User import User, UpdateUserPasswordRequest
-from di.user_dependency import user_dependency
+from di.user_dependency import user_dependency, user_db_dependency, user_read_db_dependency
 from di.injection import db_dependency
-from utils.pass_crypt import bcrypt_context
+from utils.pass_crypt import hash_password, verify_password
 from starlette import status
-from models.days import Day
-from models.effects import Effect
 from models.bugs import Bug
 from models.suggestions import Suggestion
+from utils import export
+from utils.importer import HistoryImport, import_rows
+from utils.deletion import delete_days_in_chunks
+from utils.http_cache import bump_user_version
 
 
 router = APIRouter(
@@ -17,25 +20,50 @@ router = APIRouter(
 
 
 @router.put("", status_code=status.HTTP_204_NO_CONTENT)
-async def update_password(db: db_dependency, user: user_dependency, password: UpdateUserPasswordRequest = Body()):
+def update_password(db: db_dependency, user: user_dependency, password: UpdateUserPasswordRequest = Body()):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     requested_user = db.query(User).filter(User.id == user.get('id')).one()
-    if not bcrypt_context.verify(password.current_password, requested_user.password):
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Password is not correct')
     if password.new_password != password.confirm_password:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='confirm password does not match')
-    requested_user.password = bcrypt_context.hash(password.confirm_password)
+    valid, _ = verify_password(password.current_password, requested_user.password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Password is not correct')
+    requested_user.password = hash_password(password.confirm_password)
     db.add(requested_user)
     db.commit()
 
 
 @router.delete("/data", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_account_data(db: db_dependency, user: user_dependency):
+def delete_account_data(db: db_dependency, user_db: user_db_dependency, user: user_dependency):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    db.query(Day).filter(Day.owner == user.get('id')).delete()
-    db.query(Effect).filter(Effect.owner == user.get('id')).delete()
+    delete_days_in_chunks(user_db, user.get('id'), on_commit=lambda: bump_user_version(user.get('id')))
     db.query(Bug).filter(Bug.user_id == user.get('id')).delete()
     db.query(Suggestion).filter(Suggestion.user_id == user.get('id')).delete()
-    db.commit() 
\ No newline at end of file
+    db.commit() 
+    bump_user_version(user.get('id'))
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_account_data(db: user_read_db_dependency, user: user_dependency,
+                        export_format: str = Query(default="jsonl", alias="format", pattern="^(jsonl|csv|arrow|parquet)$")):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    if export_format in export.columnar_formats and not export.has_pyarrow:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow is not installed on this server")
+    return StreamingResponse(
+        export.export_history(db.get_bind(), user.get('id'), export_format),
+        media_type=export.media_types[export_format],
+        headers={"Content-Disposition": f'attachment; filename="mymood-export.{export_format}"'},
+    )
+
+
+@router.post("/import", status_code=status.HTTP_200_OK)
+def import_account_data(db: user_db_dependency, user: user_dependency, file: UploadFile = File(),
+                        import_format: str = Query(default="jsonl", alias="format", pattern="^(jsonl|csv)$")):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    # every chunk commits on its own, a failing row only costs that row and whatever was committed before stays
+    history_import = HistoryImport(db, user.get('id'))
+    return history_import.run(import_rows(file.file, import_format), on_commit=lambda: bump_user_version(user.get('id')))
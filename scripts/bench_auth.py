@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from database.database import read_engine
+from models.User import User
+from utils.auth_utils import create_access_token, get_current_user, token_cache_key
+from utils.cache import cache
+
+# run with `python -m scripts.bench_auth` from the project root
+
+iterations = 20_000
+
+
+def measure(db: Session, user: User, cached: bool) -> float:
+    token = create_access_token(user.username, user.id, user.role, timedelta(days=1))
+    cache.delete(token_cache_key(token))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            cache.delete(token_cache_key(token))
+        get_current_user(token, db)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    # an uncached token is only accepted for a user that exists, the first one in DATABASE_URL is used
+    with Session(read_engine) as db:
+        user = db.query(User).first()
+        if user is None:
+            raise SystemExit("no users in the database, run scripts.seed_data first")
+        uncached = measure(db, user, cached=False)
+        cached = measure(db, user, cached=True)
+    print(f"without cache: {uncached * 1e6:.1f} us/request")
+    print(f"with cache:    {cached * 1e6:.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
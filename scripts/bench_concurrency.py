@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+# the app reads its settings on import, so the scratch database has to be chosen before that
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'concurrency.db')}"
+os.environ.setdefault("AUTO_MIGRATE", "true")
+os.environ.pop("SHARD_URLS", None)
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from database.database import engine  # noqa: E402
+from main import app  # noqa: E402
+from models.User import User  # noqa: E402
+from scripts.load_driver import percentile  # noqa: E402
+from utils.auth_utils import create_access_token  # noqa: E402
+
+# run with `python -m scripts.bench_concurrency [--levels 1,50,200] [--rounds N]` from the project root.
+# every level sends that many POST /days/new at once, one per user, into the in-process app on one event loop.
+# the p99 should stay close to the time the sqlite writes themselves take to drain, and the event loop should never
+# stall for long, because the handlers and their db calls run in the worker thread pool
+
+
+async def watch_loop(stalls: list[float], stop: asyncio.Event, interval: float = 0.005):
+    # how late the loop wakes up this task, a blocking call on the loop shows up as a long stall
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def log_mood(client: httpx.AsyncClient, headers: dict, date: datetime.date) -> float:
+    day = {"date": date.isoformat(), "red": 120, "green": 80, "blue": 200, "rate": 3}
+    start = time.perf_counter()
+    response = await client.post("/days/new", json=day, headers=headers)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(levels: list[int], rounds: int):
+    async with app.router.lifespan_context(app):
+        # the users only need to exist, their tokens are signed here instead of going through a password check
+        with engine.begin() as conn:
+            users = conn.execute(insert(User).returning(User.id, User.username), [
+                {"username": f"bench{number}", "password": "-", "role": "user"} for number in range(max(levels))
+            ]).all()
+        headers = [
+            {"Authorization": f"Bearer {create_access_token(username, user_id, 'user', timedelta(hours=1))}"}
+            for user_id, username in users
+        ]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mymood", timeout=120) as client:
+            date = datetime.date(2000, 1, 1)
+            print(f"{'concurrent':>10} {'requests':>9} {'req/s':>7} {'p50 ms':>9} {'p99 ms':>9} {'max stall ms':>13}")
+            for level in levels:
+                latencies, stalls, stop = [], [], asyncio.Event()
+                watcher = asyncio.create_task(watch_loop(stalls, stop))
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    latencies += await asyncio.gather(*(log_mood(client, headers[user], date) for user in range(level)))
+                    date += timedelta(days=1)
+                elapsed = time.perf_counter() - start
+                stop.set()
+                await watcher
+                latencies.sort()
+                print(f"{level:>10} {len(latencies):>9} {len(latencies) / elapsed:>7.0f} {percentile(latencies, 0.5):>9.1f} "
+                      f"{percentile(latencies, 0.99):>9.1f} {max(stalls) * 1000:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of concurrent mood logs on one worker")
+    parser.add_argument("--levels", default="1,50,200", help="comma separated numbers of requests sent at once")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run([int(level) for level in args.levels.split(",")], args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from sqlmodel import SQLModel
+
+from database.database import create_db_engine
+from models.days import Day
+from models.effects import Effect
+from utils import export
+
+# run with `python -m scripts.bench_export [--days N] [--effects-per-day N]` from the project root
+
+
+def seed(engine, owner: int, days: int, effects_per_day: int):
+    random.seed(1)
+    first = datetime.date(1900, 1, 1)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO day (id, date, red, green, blue, rate, auto_rate, owner, effect_count, effect_rate_sum, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0, ?, 0, 0, '2024-01-01 00:00:00')",
+            [(number + 1, (first + datetime.timedelta(days=number)).isoformat(), random.randint(0, 255),
+              random.randint(0, 255), random.randint(0, 255), random.randint(0, 4), owner) for number in range(days)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO effect (time, rate, description, foreign_key, owner, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, '2024-01-01 00:00:00')",
+            [(f"{random.randint(0, 23)}:{random.randint(0, 59):02d}", random.randint(0, 4), "went for a walk with friends",
+              number // effects_per_day + 1, owner) for number in range(days * effects_per_day)],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and peak memory of GET /account/export for one large history")
+    parser.add_argument("--days", type=int, default=50_000)
+    parser.add_argument("--effects-per-day", type=int, default=4)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "export.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine, tables=[Day.__table__, Effect.__table__])
+    seed(engine, 1, args.days, args.effects_per_day)
+    rows = args.days * args.effects_per_day
+    print(f"{args.days} days, {rows} effects")
+
+    formats = ["jsonl", "csv"] + (sorted(export.columnar_formats) if export.has_pyarrow else [])
+    for export_format in formats:
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in export.export_history(engine, 1, export_format))
+        elapsed = time.perf_counter() - start
+        # tracing slows the export down a lot, so memory is measured on a second, untimed pass
+        tracemalloc.start()
+        for _ in export.export_history(engine, 1, export_format):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{export_format:<8} {elapsed:6.2f}s  {rows / elapsed:9.0f} effects/s  {size / 1e6:7.1f} MB  "
+              f"peak {peak / 1e6:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
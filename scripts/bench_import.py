@@ -0,0 +1,52 @@
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from sqlmodel import Session
+
+from database.database import create_db_engine
+from database.migrations import migrate
+from scripts.bench_export import seed
+from utils import export
+from utils.day_aggregates import find_stale_day_aggregates, rebuild_day_aggregates
+from utils.importer import HistoryImport, import_rows
+from utils.month_summaries import find_stale_month_summaries, rebuild_month_summaries
+
+# run with `python -m scripts.bench_import [--days N] [--effects-per-day N]` from the project root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of POST /account/import for an exported history")
+    parser.add_argument("--days", type=int, default=25_000)
+    parser.add_argument("--effects-per-day", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "import.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    migrate(engine)
+    seed(engine, 1, args.days, args.effects_per_day)
+    with engine.begin() as conn:
+        rebuild_day_aggregates(conn)
+        rebuild_month_summaries(conn)
+    rows = args.days * (args.effects_per_day + 1)
+    print(f"{args.days} days, {args.days * args.effects_per_day} effects")
+
+    # every format is imported into a fresh owner so no day conflicts with an earlier run
+    for owner, import_format in enumerate(["jsonl", "csv"], start=2):
+        data = b"".join(chunk.encode() for chunk in export.export_history(engine, 1, import_format))
+        with Session(engine) as db:
+            start = time.perf_counter()
+            result = HistoryImport(db, owner).run(import_rows(io.BytesIO(data), import_format))
+            elapsed = time.perf_counter() - start
+        print(f"{import_format:<6} {elapsed:6.2f}s  {rows / elapsed:9.0f} rows/s  "
+              f"{result['days']} days  {result['effects']} effects  {result['error_count']} errors")
+
+    with Session(engine) as db:
+        stale = len(find_stale_day_aggregates(db)) + sum(len(rows) for rows in find_stale_month_summaries(db))
+    print(f"stale aggregate rows: {stale}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import pass_crypt
+
+# run with `python -m scripts.bench_login` from the project root
+
+logins = 64
+
+
+def main():
+    hashed = pass_crypt._hash("benchmark-password")
+    workers = 1
+    while workers <= os.cpu_count():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pool.submit(pass_crypt._verify_and_update, "warmup", hashed).result()
+            start = time.perf_counter()
+            futures = [pool.submit(pass_crypt._verify_and_update, "benchmark-password", hashed) for _ in range(logins)]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+        print(f"{workers} workers: {logins / elapsed:.1f} logins/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
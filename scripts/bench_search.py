@@ -0,0 +1,80 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import Session
+
+from database.database import create_db_engine
+from database.migrations import migrate
+from models.effects import Effect
+from utils.search import match_expression, matching_ids, owner_match_expression, search_matches
+
+# run with `python -m scripts.bench_search [--rows N]` from the project root
+
+words = ["exam", "walk", "coffee", "friends", "work", "sleep", "gym", "rain", "movie", "family", "study", "music",
+         "deadline", "travel", "cooking", "reading", "meeting", "headache", "party", "garden"]
+
+
+def seed(engine, rows: int, owners: int):
+    random.seed(1)
+    batch = 50_000
+    with engine.begin() as conn:
+        # effects point at the first 1000 days, the day rows have to exist for the foreign key
+        conn.exec_driver_sql(
+            "INSERT INTO day (id, date, red, green, blue, rate, auto_rate, owner, effect_count, effect_rate_sum, updated_at) "
+            "VALUES (?, date('2000-01-01', ? || ' days'), 0, 0, 0, 0, 0, 1, 0, 0, '2024-01-01 00:00:00')",
+            [(number + 1, number) for number in range(1000)],
+        )
+        for start in range(0, rows, batch):
+            conn.exec_driver_sql(
+                "INSERT INTO effect (time, rate, description, foreign_key, owner, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [("10:00", random.randint(0, 4), " ".join(random.choices(words, k=4)) + f" note{number}",
+                  number % 1000 + 1, number % owners + 1, "2024-01-01 00:00:00")
+                 for number in range(start, min(start + batch, rows))],
+            )
+
+
+def timed(db: Session, query, repeat: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        count = len(db.execute(query.statement).all())
+    return (time.perf_counter() - start) / repeat, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LIKE scan against the FTS5 index over effect descriptions")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "search.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    migrate(engine)
+    start = time.perf_counter()
+    seed(engine, args.rows, args.owners)
+    print(f"seeded {args.rows} effects for {args.owners} users in {time.perf_counter() - start:.1f}s (index kept by triggers)")
+
+    owner, term = 7, "deadline"
+    with Session(engine) as db:
+        user_matches = search_matches(Effect, owner_match_expression(owner, term)).subquery()
+        all_matches = search_matches(Effect, match_expression(term)).subquery()
+        cases = {
+            "one user, LIKE": db.query(Effect).filter(Effect.owner == owner).filter(Effect.description.contains(term)),
+            "one user, FTS5": db.query(Effect).join(user_matches, user_matches.c.id == Effect.id)
+            .filter(Effect.owner == owner).order_by(user_matches.c.rank),
+            "all users, LIKE": db.query(Effect).filter(Effect.description.contains(term)).limit(100),
+            "all users, FTS5": db.query(Effect).join(all_matches, all_matches.c.id == Effect.id)
+            .order_by(all_matches.c.rank).limit(100),
+            "rare word, LIKE": db.query(Effect).filter(Effect.description.contains(f"note{args.rows - 1}")),
+            "rare word, FTS5": db.query(Effect).filter(Effect.id.in_(matching_ids(Effect, match_expression(f"note{args.rows - 1}")))),
+        }
+        for name, query in cases.items():
+            seconds, count = timed(db, query, args.repeat)
+            print(f"{name:<18} {seconds * 1000:9.2f} ms  ({count} rows)")
+
+
+if __name__ == "__main__":
+    main()
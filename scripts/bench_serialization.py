@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlmodel import Session, SQLModel
+
+from database.database import create_db_engine
+from models.days import Day
+from models.effects import Effect
+from scripts.bench_export import seed
+from utils import responses
+from utils.day_aggregates import day_average
+from utils.pagination import model_columns, row_to_dict
+
+# run with `python -m scripts.bench_serialization [--days N] [--repeat N]` from the project root.
+# times the body of GET /days for one user's whole history: loading the rows and turning them into json
+
+
+def orm_body(db: Session, owner: int) -> bytes:
+    # the previous path: hydrated Day instances, fastapi's jsonable_encoder, then json.dumps
+    rows = db.execute(select(Day, Day.id).where(Day.owner == owner).order_by(Day.id)).all()
+    content = [{"day": row.Day, "average": day_average(row.Day)} for row in rows]
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+
+
+def projected_body(db: Session, owner: int) -> bytes:
+    columns = model_columns(Day)
+    day_dict = row_to_dict(columns)
+    rows = db.execute(select(*columns, Day.id).where(Day.owner == owner).order_by(Day.id)).all()
+    return responses.dump_json([{"day": day_dict(row), "average": day_average(row)} for row in rows])
+
+
+def measure(engine, body, repeat: int) -> tuple[float, float, int]:
+    wall = cpu = 0.0
+    size = 0
+    for _ in range(repeat):
+        # a new session per run, like a request, so no run reuses instances from the identity map
+        with Session(engine) as db:
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            size = len(body(db, 1))
+            wall += time.perf_counter() - wall_start
+            cpu += time.process_time() - cpu_start
+    return wall / repeat, cpu / repeat, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU per request of GET /days, ORM + jsonable_encoder against projected rows")
+    parser.add_argument("--days", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "serialization.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine, tables=[Day.__table__, Effect.__table__])
+    seed(engine, 1, args.days, 3)
+    print(f"{args.days} days, orjson {'installed' if responses.orjson is not None else 'missing, pydantic_core fallback'}")
+
+    results = {}
+    for name, body in [("orm + jsonable_encoder", orm_body), ("projected rows", projected_body)]:
+        measure(engine, body, 2)
+        wall, cpu, size = measure(engine, body, args.repeat)
+        results[name] = cpu
+        print(f"{name:<24} {wall * 1000:7.1f} ms wall  {cpu * 1000:7.1f} ms cpu  {size / 1e6:5.2f} MB")
+    before, after = results.values()
+    print(f"cpu saved per request: {(before - after) * 1000:.1f} ms ({1 - after / before:.0%}), {before / after:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
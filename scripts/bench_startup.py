@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from database.database import create_db_engine
+from database.migrations import migrate
+
+# run with `python -m scripts.bench_startup [--runs N]` from the project root.
+# every run is a fresh interpreter, like a worker an autoscaler just started, against an already migrated database
+
+worker = """
+import asyncio, json, time
+start = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (ready - imported) * 1000,
+                  "ready_ms": (ready - start) * 1000}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from a new interpreter to a worker ready to serve")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    migrate(create_db_engine(f"sqlite:///{path}"))
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    runs = []
+    for _ in range(args.runs + 1):
+        output = subprocess.run([sys.executable, "-c", worker], env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.splitlines()[-1]))
+    # the first run also pays for cold disk caches and writing .pyc files
+    runs = runs[1:]
+    for key in ("import_ms", "startup_ms", "ready_ms"):
+        values = [run[key] for run in runs]
+        print(f"{key:<11} median {statistics.median(values):7.1f}  min {min(values):7.1f}  max {max(values):7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import datetime
+
+from sqlmodel import Session, SQLModel
+
+from database.database import engine
+from models.bugs import Bug
+from models.days import Day
+from models.effects import Effect
+from models.suggestions import Suggestion
+
+# run with `python -m scripts.explain_queries` from the project root
+
+
+def route_queries(db: Session):
+    owner = 1
+    return {
+        "POST /days/new": db.query(Day).filter(Day.owner == owner).filter(Day.date == datetime.date(2024, 1, 1)),
+        "GET /days/date": db.query(Day).filter(Day.owner == owner).filter(Day.date == datetime.date(2024, 1, 1)),
+        "GET /days/range": db.query(Day).filter(Day.owner == owner)
+        .filter(Day.date.between(datetime.date(2024, 1, 1), datetime.date(2024, 2, 1))).order_by(Day.date),
+        "GET /days": db.query(Day).filter(Day.owner == owner).order_by(Day.id),
+        "GET /days/overview": db.query(Day, Effect).outerjoin(Effect, (Effect.owner == Day.owner) & (Effect.foreign_key == Day.id))
+        .filter(Day.owner == owner).filter(Day.id.in_([1, 2, 3])),
+        "GET /effects": db.query(Effect).filter(Effect.owner == owner),
+        "GET /effects/foreign_key/{foreign_key}": db.query(Effect).filter(Effect.owner == owner)
+        .filter(Effect.foreign_key == 1),
+        "POST /effects/filter": db.query(Effect).filter(Effect.owner == owner).filter(Effect.rate.in_([1, 2])),
+        "GET /bugs": db.query(Bug).filter(Bug.user_id == owner),
+        "GET /suggestions": db.query(Suggestion).filter(Suggestion.user_id == owner),
+    }
+
+
+def main():
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        for route, query in route_queries(db).items():
+            compiled = query.statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+            params = tuple(compiled.params[key] for key in compiled.positiontup)
+            plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+            print(route)
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import select
+from sqlmodel import Session
+
+from main import app
+from database.database import engine
+from models.User import User
+from utils.config import settings
+
+# run with `python -m scripts.load_driver [--scenario NAME] [--concurrency N] [--duration S] [--output FILE]
+# [--baseline FILE --budget 0.2]` from the project root, after filling the database with scripts.seed_data.
+# without --url the requests go straight into the app from main.py, against DATABASE_URL
+
+# relative weights of the actions every virtual user picks from
+scenarios = {
+    "mixed": {"list_days": 30, "overview": 15, "create_day": 15, "create_effect": 25, "admin_lists": 10, "login": 5},
+    "read-heavy": {"list_days": 55, "overview": 30, "create_day": 3, "create_effect": 5, "admin_lists": 5, "login": 2},
+    "write-heavy": {"list_days": 15, "overview": 5, "create_day": 35, "create_effect": 40, "admin_lists": 3, "login": 2},
+}
+
+descriptions = ["went for a walk", "had coffee with friends", "long day at work", "slept badly", "went to the gym"]
+
+
+class Recorder:
+    def __init__(self, record_after: float):
+        self.record_after = record_after
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        if start >= self.record_after:
+            self.latencies[route].append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, username: str, password: str,
+                 admin_headers: dict):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.username = username
+        self.password = password
+        self.admin_headers = admin_headers
+        self.headers = {}
+        self.day_ids = []
+        # far in the future and random per run, so repeated runs against one database do not collide with earlier days
+        self.next_date = datetime.date(2100, 1, 1) + datetime.timedelta(days=rng.randrange(2_500_000))
+
+    async def login(self):
+        response = await self.recorder.request(self.client, "POST /auth/token", "POST", "/auth/token",
+                                               data={"username": self.username, "password": self.password})
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def list_days(self):
+        response = await self.recorder.request(self.client, "GET /days", "GET", "/days", headers=self.headers,
+                                               params={"limit": 50})
+        if response.status_code == 200 and response.json():
+            self.day_ids = [row["day"]["id"] for row in response.json()][-20:] + self.day_ids[-20:]
+
+    async def overview(self):
+        if not self.day_ids:
+            return await self.list_days()
+        await self.recorder.request(self.client, "GET /days/overview", "GET", "/days/overview", headers=self.headers,
+                                    params={"days_id": self.rng.sample(self.day_ids, min(7, len(self.day_ids)))})
+
+    async def create_day(self):
+        rate = self.rng.randint(0, 4)
+        day = {"date": self.next_date.isoformat(), "red": self.rng.randint(0, 255), "green": self.rng.randint(0, 255),
+               "blue": self.rng.randint(0, 255), "rate": rate}
+        self.next_date += datetime.timedelta(days=1)
+        await self.recorder.request(self.client, "POST /days/new", "POST", "/days/new", headers=self.headers, json=day)
+
+    async def create_effect(self):
+        if not self.day_ids:
+            return await self.list_days()
+        effect = {"time": f"{self.rng.randint(7, 23)}:{self.rng.randint(0, 59):02d}", "rate": self.rng.randint(0, 4),
+                  "description": self.rng.choice(descriptions), "foreign_key": self.rng.choice(self.day_ids)}
+        await self.recorder.request(self.client, "POST /effects/new", "POST", "/effects/new", headers=self.headers,
+                                    json=effect)
+
+    async def admin_lists(self):
+        path = self.rng.choice(["/admin/bugs", "/admin/suggestions", "/admin/users"])
+        await self.recorder.request(self.client, f"GET {path}", "GET", path, headers=self.admin_headers,
+                                    params={"limit": 50})
+
+    async def run(self, weights: dict, deadline: float):
+        await self.login()
+        actions = [getattr(self, name) for name in weights]
+        while time.perf_counter() < deadline:
+            await self.rng.choices(actions, weights=list(weights.values()))[0]()
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    # nearest rank on the sorted latencies
+    return values[max(0, min(len(values) - 1, round(fraction * len(values)) - 1))]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[route],
+            "throughput_rps": len(latencies) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies),
+            "p50_ms": percentile(latencies, 0.5),
+            "p90_ms": percentile(latencies, 0.9),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1],
+        }
+    requests = sum(route["requests"] for route in routes.values())
+    return {
+        "requests": requests,
+        "errors": sum(route["errors"] for route in routes.values()),
+        "throughput_rps": requests / elapsed,
+        "routes": routes,
+    }
+
+
+def seeded_usernames(count: int) -> list[str]:
+    with Session(engine) as db:
+        return list(db.scalars(select(User.username).where(User.role == "user").order_by(User.id).limit(count)))
+
+
+async def run_load(args) -> dict:
+    rng = random.Random(args.seed)
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, timeout=60))
+            usernames = [f"user{args.first_user + number}" for number in range(args.concurrency)]
+        else:
+            # ASGITransport does not run the lifespan, the startup hooks (schema check, first admin) run here
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mymood", timeout=60)
+            )
+            usernames = seeded_usernames(args.concurrency)
+        if len(usernames) < args.concurrency:
+            sys.exit(f"only {len(usernames)} seeded users for {args.concurrency} virtual users, run scripts.seed_data first")
+        response = await client.post("/auth/token", data={"username": args.admin_username, "password": args.admin_password})
+        admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"} if response.status_code == 200 else {}
+        start = time.perf_counter()
+        recorder = Recorder(start + args.warmup)
+        deadline = start + args.warmup + args.duration
+        users = [
+            VirtualUser(client, recorder, random.Random(rng.random()), username, args.password, admin_headers)
+            for username in usernames
+        ]
+        await asyncio.gather(*(user.run(scenarios[args.scenario], deadline) for user in users))
+        elapsed = time.perf_counter() - start - args.warmup
+    return {
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "duration_s": elapsed,
+        "target": args.url or "in-process",
+        **summarize(recorder, elapsed),
+    }
+
+
+def compare(results: dict, baseline: dict, budget: float, metric: str, slack_ms: float) -> list[dict]:
+    # a route regresses when its latency grows past the budget (plus a little absolute slack for very fast routes)
+    # or when it starts failing more often
+    report = []
+    for route, current in results["routes"].items():
+        base = baseline["routes"].get(route)
+        if base is None:
+            continue
+        allowed = base[metric] * (1 + budget) + slack_ms
+        error_rate = current["errors"] / current["requests"]
+        base_error_rate = base["errors"] / base["requests"]
+        report.append({
+            "route": route,
+            "baseline_ms": base[metric],
+            "current_ms": current[metric],
+            "change": current[metric] / base[metric] - 1 if base[metric] else None,
+            "regressed": current[metric] > allowed or error_rate > base_error_rate + 0.01,
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scenario driven HTTP load against the API, results as JSON")
+    parser.add_argument("--scenario", choices=sorted(scenarios), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users, each logged in as its own seeded user")
+    parser.add_argument("--duration", type=float, default=30, help="seconds measured after the warmup")
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--url", help="base url of a running server instead of the in-process app")
+    parser.add_argument("--first-user", type=int, default=1, help="with --url, virtual users log in as user<first-user + n>")
+    parser.add_argument("--password", default="password12")
+    parser.add_argument("--admin-username", default=settings.first_admin_username)
+    parser.add_argument("--admin-password", default=settings.first_admin_password)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--results", help="compare an earlier results file instead of running")
+    parser.add_argument("--baseline", help="results file to compare against, exits with 1 on a regression")
+    parser.add_argument("--budget", type=float, default=0.2, help="allowed latency growth, 0.2 is 20%%")
+    parser.add_argument("--metric", choices=["mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms"], default="p95_ms")
+    parser.add_argument("--slack-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as file:
+            results = json.load(file)
+    else:
+        results = asyncio.run(run_load(args))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        results["comparison"] = compare(results, baseline, args.budget, args.metric, args.slack_ms)
+        regressed = any(route["regressed"] for route in results["comparison"])
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
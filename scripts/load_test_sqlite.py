@@ -0,0 +1,84 @@
+import argparse
+import datetime
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine
+
+from database.database import create_db_engine
+from models.days import Day
+from models.effects import Effect
+from utils.day_aggregates import add_effects_to_day
+
+# run with `python -m scripts.load_test_sqlite [--baseline]` from the project root
+
+
+def write_effects(engine, owner: int, count: int) -> int:
+    locked = 0
+    for _ in range(count):
+        try:
+            with Session(engine) as db:
+                day = db.query(Day).filter(Day.owner == owner).first()
+                db.add(Effect(time="10:00", rate=3, description="load test", foreign_key=day.id, owner=owner))
+                add_effects_to_day(db, owner, day.id, 1, 3)
+                db.commit()
+        except OperationalError as error:
+            if "locked" not in str(error):
+                raise
+            locked += 1
+    return locked
+
+
+def read_days(engine, owner: int, count: int) -> int:
+    locked = 0
+    for _ in range(count):
+        try:
+            with Session(engine) as db:
+                db.query(Day).filter(Day.owner == owner).all()
+                db.query(Effect).filter(Effect.owner == owner).limit(100).all()
+        except OperationalError as error:
+            if "locked" not in str(error):
+                raise
+            locked += 1
+    return locked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read/write load against a scratch SQLite database")
+    parser.add_argument("--baseline", action="store_true", help="use a plain create_engine without the tuning layer")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "load.db")
+    url = f"sqlite:///{path}"
+    if args.baseline:
+        engine = read_engine = create_engine(url, connect_args={"check_same_thread": False})
+    else:
+        engine = create_db_engine(url)
+        read_engine = create_db_engine(url, read_only=True)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        for owner in range(args.writers):
+            db.add(Day(date=datetime.date(2024, 1, 1), red=0, green=0, blue=0, rate=3, auto_rate=False, owner=owner))
+        db.commit()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.writers + args.readers) as pool:
+        writes = [pool.submit(write_effects, engine, owner, args.operations) for owner in range(args.writers)]
+        reads = [pool.submit(read_days, read_engine, owner, args.operations) for owner in range(args.readers)]
+        write_errors = sum(future.result() for future in writes)
+        read_errors = sum(future.result() for future in reads)
+    elapsed = time.perf_counter() - start
+
+    total = (args.writers + args.readers) * args.operations
+    print(f"{total} transactions in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+    print(f"'database is locked' errors: {write_errors} writes, {read_errors} reads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import sys
+
+from database.bootstrap import create_first_admin
+from database.database import create_db_engine
+from database.migrations import latest_version, migrate, schema_version
+from utils.config import settings
+
+# run with `python -m scripts.migrate [--database-url URL] [--check]` from the project root, once per deploy and
+# before the new workers start: they only check that the schema version matches and refuse to boot otherwise.
+# every shard in SHARD_URLS is migrated along with the main database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bring the database schema up to date and create the first admin")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--check", action="store_true", help="only report the schema version, exit with 1 when behind")
+    args = parser.parse_args()
+
+    engines = [create_db_engine(url) for url in dict.fromkeys([args.database_url, *settings.shard_urls])]
+    if args.check:
+        behind = False
+        for engine in engines:
+            version = schema_version(engine)
+            behind = behind or version != latest_version
+            print(f"{engine.url!r}: schema version {version}, this release needs {latest_version}")
+        sys.exit(1 if behind else 0)
+    for engine in engines:
+        before, after = migrate(engine)
+        print(f"{engine.url!r}: " + (f"schema version {before} -> {after}" if after != before else f"schema already at version {after}"))
+    if create_first_admin(engines[0]):
+        print(f"created the first admin {settings.first_admin_username!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import datetime
+
+from sqlalchemy import delete, select
+from sqlmodel import Session
+
+from database.shards import shard_router
+from models.tombstones import Tombstone
+from utils.config import settings
+from utils.date_utils import utcnow
+from utils.deletion import delete_chunk_size
+
+# run with `python -m scripts.prune_tombstones` from the project root, daily from cron or similar. /sync answers 410
+# to a since older than TOMBSTONE_RETENTION_DAYS, so nothing reads the tombstones this removes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete tombstones older than TOMBSTONE_RETENTION_DAYS")
+    parser.parse_args()
+
+    horizon = utcnow() - datetime.timedelta(days=settings.tombstone_retention_days)
+    for engine in shard_router.engines:
+        pruned = 0
+        with Session(engine) as db:
+            # in chunks, the app keeps writing in between
+            while ids := db.scalars(select(Tombstone.id).where(Tombstone.deleted_at < horizon).limit(delete_chunk_size)).all():
+                db.execute(delete(Tombstone).where(Tombstone.id.in_(ids)))
+                db.commit()
+                pruned += len(ids)
+        print(f"{engine.url!r}: pruned {pruned} tombstones")
+
+
+if __name__ == "__main__":
+    main()
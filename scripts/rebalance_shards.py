@@ -0,0 +1,112 @@
+import argparse
+
+from sqlalchemy import insert, select
+from sqlmodel import Session
+
+from database.shards import shard_router
+from models.days import Day
+from models.effects import Effect
+from models.summaries import MonthSummary
+from models.tombstones import Tombstone
+from utils import export
+from utils.date_utils import utcnow
+from utils.deletion import delete_chunk_size
+from utils.http_cache import bump_user_version
+from utils.importer import HistoryImport, ImportRow
+
+# run with `python -m scripts.rebalance_shards [--dry-run]` from the project root, with SHARD_URLS already set to the
+# new list of shards and the app stopped: every user whose rows sit on a shard the ring no longer gives them is
+# copied to their new shard and then removed from the old one. a run that stopped halfway can be started again
+
+
+def shard_owners(db: Session) -> set[int]:
+    owners = set()
+    for model in (Day, MonthSummary, Tombstone):
+        owners.update(db.scalars(select(model.owner).distinct()))
+    return owners
+
+
+def has_rows(db: Session, owner: int) -> bool:
+    return any(db.scalar(select(model.id).where(model.owner == owner).limit(1)) is not None for model in (Day, Tombstone))
+
+
+def copy_user(source: Session, target: Session, owner: int) -> dict:
+    # the days come back through the import, so the aggregates and month summaries are built on the target as they
+    # would be for an upload; the rows get new ids there
+    old_days, old_effects = [], []
+
+    def rows():
+        for line, day in enumerate(export.history_days(source.get_bind(), owner), start=1):
+            effects = day.pop("effects")
+            old_effects.extend(effect["id"] for effect in effects)
+            old_days.append(day.pop("id"))
+            yield ImportRow(line, str(old_days[-1]), day, effects)
+
+    history_import = HistoryImport(target, owner)
+    result = history_import.run(rows(), commit=False)
+    if result["error_count"]:
+        target.rollback()
+        return result
+    # synced clients still hold the old ids, they are told to drop them like any deletion and get the new rows as changes
+    now = utcnow()
+    new_days = set(target.scalars(select(Day.id).where(Day.owner == owner)))
+    new_effects = set(target.scalars(select(Effect.id).where(Effect.owner == owner)))
+    tombstones = [{"owner": owner, "kind": "day", "record_id": day_id, "deleted_at": now}
+                  for day_id in old_days if day_id not in new_days]
+    tombstones += [{"owner": owner, "kind": "effect", "record_id": effect_id, "deleted_at": now}
+                   for effect_id in old_effects if effect_id not in new_effects]
+    tombstones += [{"owner": owner, "kind": row.kind, "record_id": row.record_id, "deleted_at": row.deleted_at}
+                   for row in source.query(Tombstone).filter(Tombstone.owner == owner)]
+    if tombstones:
+        target.execute(insert(Tombstone), tombstones)
+    target.commit()
+    return result
+
+
+def drop_user(db: Session, owner: int):
+    while day_ids := db.scalars(select(Day.id).where(Day.owner == owner).limit(delete_chunk_size)).all():
+        # effects go with their day through ON DELETE CASCADE
+        db.query(Day).filter(Day.id.in_(day_ids)).delete(synchronize_session=False)
+        db.commit()
+    for model in (MonthSummary, Tombstone):
+        db.query(model).filter(model.owner == owner).delete(synchronize_session=False)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move every user's days and effects to the shard the ring assigns them")
+    parser.add_argument("--dry-run", action="store_true", help="only report which users would move")
+    args = parser.parse_args()
+
+    moved = failed = 0
+    for source_shard, source_engine in enumerate(shard_router.engines):
+        with Session(source_engine) as source:
+            misplaced = sorted(owner for owner in shard_owners(source) if shard_router.shard_for(owner) != source_shard)
+            # writer sessions begin with the write lock, the export below reads through a session of its own
+            source.commit()
+            print(f"shard {source_shard}: {len(misplaced)} users to move")
+            for owner in misplaced:
+                target_shard = shard_router.shard_for(owner)
+                if args.dry_run:
+                    print(f"user {owner}: shard {source_shard} -> {target_shard}")
+                    continue
+                with Session(shard_router.engines[target_shard]) as target:
+                    # rows on the target mean an earlier run committed the copy and stopped before the cleanup
+                    if not has_rows(target, owner):
+                        result = copy_user(source, target, owner)
+                        if result["error_count"]:
+                            failed += 1
+                            print(f"user {owner}: not moved, {result['error_count']} rows failed to import: {result['errors']}")
+                            continue
+                        print(f"user {owner}: shard {source_shard} -> {target_shard}, "
+                              f"{result['days']} days, {result['effects']} effects")
+                drop_user(source, owner)
+                bump_user_version(owner)
+                moved += 1
+    print(f"moved {moved} users" + (f", {failed} left in place" if failed else ""))
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+
+from sqlmodel import Session
+
+from database.shards import shard_router
+from utils.day_aggregates import find_stale_day_aggregates, rebuild_day_aggregates
+
+# run with `python -m scripts.rebuild_day_aggregates [--check]` from the project root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-day effect_count/effect_rate_sum columns")
+    parser.add_argument("--check", action="store_true", help="only report days whose aggregates are out of date")
+    args = parser.parse_args()
+    stale_total = 0
+    for engine in shard_router.engines:
+        with Session(engine) as db:
+            stale = find_stale_day_aggregates(db)
+            stale_total += len(stale)
+            for row in stale:
+                print(f"day {row.id} (owner {row.owner}): stored {row.effect_count}/{row.effect_rate_sum}, "
+                      f"actual {row.actual_count}/{row.actual_rate_sum}")
+            print(f"{engine.url!r}: {len(stale)} stale days")
+            if args.check:
+                continue
+            rebuilt = rebuild_day_aggregates(db)
+            db.commit()
+            print(f"{engine.url!r}: rebuilt {rebuilt} days")
+    if args.check:
+        raise SystemExit(1 if stale_total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import argparse
+
+from sqlmodel import Session
+
+from database.shards import shard_router
+from utils.month_summaries import find_stale_month_summaries, rebuild_month_summaries
+
+# run with `python -m scripts.rebuild_month_summaries [--check]` from the project root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild the per-user monthly summary table")
+    parser.add_argument("--check", action="store_true", help="only report months whose stored sums are out of date")
+    args = parser.parse_args()
+    stale_total = 0
+    for engine in shard_router.engines:
+        with Session(engine) as db:
+            missing, wrong = find_stale_month_summaries(db)
+            stale_total += len(missing) + len(wrong)
+            for row in wrong:
+                print(f"stored   {tuple(row)}")
+            for row in missing:
+                print(f"expected {tuple(row)}")
+            print(f"{engine.url!r}: {len(wrong)} stale or extra months, {len(missing)} missing or different months")
+            if args.check:
+                continue
+            rebuilt = rebuild_month_summaries(db)
+            db.commit()
+            print(f"{engine.url!r}: rebuilt {rebuilt} months")
+    if args.check:
+        raise SystemExit(1 if stale_total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import datetime
+import math
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from sqlalchemy import func, insert, select, text
+from sqlmodel import Session
+
+from database import database
+from database.database import create_db_engine
+from database.migrations import migrate
+from database.shards import shard_router
+from models.bugs import Bug
+from models.days import Day
+from models.effects import Effect
+from models.suggestions import Suggestion
+from models.User import User
+from utils import pass_crypt
+from utils.config import settings
+from utils.date_utils import utcnow
+from utils.month_summaries import rebuild_month_summaries
+from utils.search import create_fts_indexes, fts_indexes
+
+# run with `python -m scripts.seed_data [--users N] [--years N] [--effects-per-day N] [--seed N]` from the project root.
+# every seeded user is "user<id>" with the same password, scripts/load_driver.py logs in as them
+
+activities = ["went for a walk", "had coffee", "met friends", "worked late", "slept badly", "went to the gym",
+              "studied for an exam", "watched a movie", "called family", "cooked dinner", "read a book",
+              "had a headache", "missed the bus", "played music", "cleaned the house", "went shopping", "meditated",
+              "had a long meeting", "finished a project", "argued with someone", "went to a party", "worked in the garden"]
+qualifiers = ["", "in the rain", "with my sister", "after work", "all morning", "for an hour", "again", "alone",
+              "with coworkers", "before bed", "on the weekend", "downtown"]
+bug_titles = ["App crashes", "Sync is slow", "Wrong colors", "Login fails", "Stats are off"]
+
+
+def mood(rng: random.Random, baseline: float, date: datetime.date) -> int:
+    # a per-user baseline, better weekends, a slow seasonal swing and daily noise
+    seasonal = 0.4 * math.sin(2 * math.pi * date.timetuple().tm_yday / 365)
+    weekend = 0.3 if date.weekday() >= 5 else 0
+    return min(4, max(0, round(baseline + seasonal + weekend + rng.gauss(0, 0.8))))
+
+
+def mood_color(rng: random.Random, rate: int) -> tuple[int, int, int]:
+    # low moods lean blue, high moods lean yellow
+    def channel(value):
+        return min(255, max(0, round(value + rng.gauss(0, 25))))
+    return channel(40 + 50 * rate), channel(60 + 40 * rate), channel(220 - 45 * rate)
+
+
+def user_history(rng: random.Random, owner: int, first_day_id: int, start: datetime.date, days: int,
+                 effects_per_day: float) -> tuple[list, list]:
+    baseline = rng.uniform(1.2, 3.2)
+    fill = rng.uniform(0.6, 0.98)
+    day_rows, effect_rows = [], []
+    for offset in range(days):
+        if rng.random() > fill:
+            continue
+        date = start + datetime.timedelta(days=offset)
+        day_id = first_day_id + len(day_rows)
+        rate = mood(rng, baseline, date)
+        red, green, blue = mood_color(rng, rate)
+        count = 0
+        rate_sum = 0
+        for _ in range(min(12, int(rng.expovariate(1 / effects_per_day) + 0.5))):
+            effect_rate = min(4, max(0, rate + rng.choice((-1, 0, 0, 0, 1))))
+            description = f"{rng.choice(activities)} {rng.choice(qualifiers)}".strip()
+            effect_rows.append({"time": f"{rng.randint(7, 23)}:{rng.randint(0, 59):02d}", "rate": effect_rate,
+                                "description": description, "foreign_key": day_id, "owner": owner})
+            count += 1
+            rate_sum += effect_rate
+        day_rows.append({"id": day_id, "date": date, "red": red, "green": green, "blue": blue, "rate": rate,
+                         "auto_rate": rng.random() < 0.3, "owner": owner, "effect_count": count,
+                         "effect_rate_sum": rate_sum})
+    return day_rows, effect_rows
+
+
+def reports(rng: random.Random, users: list[tuple[int, str]]) -> tuple[list, list]:
+    bugs, suggestions = [], []
+    for user_id, username in users:
+        if rng.random() < 0.03:
+            bugs.append({"username": username, "user_id": user_id, "title": rng.choice(bug_titles),
+                         "description": f"{rng.choice(bug_titles)} when I open the app. " * 3,
+                         "approved": rng.random() < 0.5, "done": rng.random() < 0.2})
+        if rng.random() < 0.03:
+            suggestions.append({"username": username, "user_id": user_id,
+                                "description": f"It would be nice to track {rng.choice(activities)} automatically",
+                                "approved": rng.random() < 0.5, "done": rng.random() < 0.2})
+    return bugs, suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic users, days and effects")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--effects-per-day", type=float, default=3)
+    parser.add_argument("--password", default="password12")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-users", type=int, default=50, help="users written per transaction")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.database_url == settings.database_url:
+        engine, shard_engines, shard_for = database.engine, shard_router.engines, shard_router.shard_for
+    else:
+        engine = create_db_engine(args.database_url)
+        shard_engines, shard_for = [engine], lambda owner: 0
+    for database_engine in dict.fromkeys([engine, *shard_engines]):
+        migrate(database_engine)
+    # one bcrypt hash shared by every seeded user, hashing thousands of them would take longer than the rest
+    password = pass_crypt._hash(args.password)
+    days = round(args.years * 365)
+    start = utcnow().date() - datetime.timedelta(days=days)
+
+    started = time.perf_counter()
+    with Session(engine) as db, ExitStack() as stack:
+        # users and reports go to the main database, days and effects to each user's shard
+        shard_dbs = [db if shard_engine is engine else stack.enter_context(Session(shard_engine))
+                     for shard_engine in shard_engines]
+        # the effect_fts triggers are dropped while seeding and the index is rebuilt once at the end. effects the app
+        # writes into the same database meanwhile are missing from search until then, and the finally puts the
+        # triggers back and rebuilds the index even when seeding stops halfway
+        name = fts_indexes["effect"][0]
+        total_days = total_effects = 0
+        try:
+            for shard_db in shard_dbs:
+                for suffix in ("ai", "ad", "au"):
+                    shard_db.execute(text(f"DROP TRIGGER IF EXISTS {name}_{suffix}"))
+                shard_db.commit()
+            for batch_start in range(0, args.users, args.batch_users):
+                # past every id sqlite has handed out, ids of deleted users are not given out again
+                first_user_id = (db.scalar(text("SELECT seq FROM sqlite_sequence WHERE name = 'user'")) or 0) + 1
+                users = [(user_id, f"user{user_id}") for user_id in
+                         range(first_user_id, first_user_id + min(args.batch_users, args.users - batch_start))]
+                db.execute(insert(User), [{"id": user_id, "username": username, "password": password, "role": "user"}
+                                          for user_id, username in users])
+                shard_users = defaultdict(list)
+                for user_id, _ in users:
+                    shard_users[shard_for(user_id)].append(user_id)
+                for shard, user_ids in shard_users.items():
+                    shard_db = shard_dbs[shard]
+                    next_day_id = (shard_db.scalar(select(func.max(Day.id))) or 0) + 1
+                    day_rows, effect_rows = [], []
+                    for user_id in user_ids:
+                        user_days, user_effects = user_history(rng, user_id, next_day_id + len(day_rows), start, days,
+                                                               args.effects_per_day)
+                        day_rows += user_days
+                        effect_rows += user_effects
+                    if day_rows:
+                        shard_db.connection().execute(insert(Day.__table__), day_rows)
+                    if effect_rows:
+                        shard_db.connection().execute(insert(Effect.__table__), effect_rows)
+                    shard_db.commit()
+                    total_days += len(day_rows)
+                    total_effects += len(effect_rows)
+                bugs, suggestions = reports(rng, users)
+                if bugs:
+                    db.execute(insert(Bug), bugs)
+                if suggestions:
+                    db.execute(insert(Suggestion), suggestions)
+                db.commit()
+                print(f"{batch_start + len(users)}/{args.users} users, {total_days} days, {total_effects} effects "
+                      f"({time.perf_counter() - started:.0f}s)", flush=True)
+            for shard_db in dict.fromkeys([db, *shard_dbs]):
+                rebuild_month_summaries(shard_db)
+                shard_db.commit()
+        finally:
+            for shard_db in dict.fromkeys([db, *shard_dbs]):
+                shard_db.rollback()
+                create_fts_indexes(shard_db.connection())
+                shard_db.commit()
+    print(f"seeded {args.users} users, {total_days} days and {total_effects} effects in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import itertools
+import os
+import tempfile
+
+# settings are read once when the app is imported, so the test database and secrets have to be in place before that
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/test.db",
+    "AUTO_MIGRATE": "true",
+    "BCRYPT_ROUNDS": "4",
+    "FIRST-ADMIN-USERNAME": "admin",
+    "FIRST-ADMIN-PASSWORD": "adminpass1",
+    "METRICS_ENABLED": "false",
+})
+for name in ("CACHE_URL", "SHARD_URLS", "SINGLE_WORKER", "DATABASE_READ_URL"):
+    os.environ.pop(name, None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+
+usernames = (f"tester{number}" for number in itertools.count(1))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def user_id(headers: dict) -> int:
+    return jwt.get_unverified_claims(headers["Authorization"].removeprefix("Bearer "))["id"]
+
+
+@pytest.fixture
+def user_headers(client):
+    # every test gets a user of its own, so tests sharing the database never see each other's days
+    response = client.post("/auth/", json={"username": next(usernames), "password": "password12"})
+    return bearer(response.json()["access_token"])
+
+
+@pytest.fixture
+def admin_headers(client):
+    response = client.post("/auth/token", data={"username": "admin", "password": "adminpass1"})
+    return bearer(response.json()["access_token"])
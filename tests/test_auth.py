@@ -0,0 +1,15 @@
+from tests.conftest import bearer, user_id, usernames
+
+
+def test_deleted_user_token_stops_working(client, user_headers, admin_headers):
+    day = {"date": "2024-06-01", "red": 1, "green": 2, "blue": 3, "rate": 3}
+    # the claims are cached by the first requests
+    assert client.get("/days", headers=user_headers).status_code == 200
+    assert client.post("/days/new", json=day, headers=user_headers).status_code == 201
+    deleted = user_id(user_headers)
+    assert client.delete(f"/admin/users/{deleted}", headers=admin_headers).status_code == 204
+    assert client.get("/days", headers=user_headers).status_code == 401
+    assert client.post("/days/new", json={**day, "date": "2024-06-02"}, headers=user_headers).status_code == 401
+    # ids are never handed out again, so no later signup inherits rows of the deleted user
+    response = client.post("/auth/", json={"username": next(usernames), "password": "password12"})
+    assert user_id(bearer(response.json()["access_token"])) > deleted
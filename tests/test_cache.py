@@ -0,0 +1,208 @@
+import datetime
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from database.database import engine
+from database.shards import shard_router
+from models.days import Day
+from models.effects import Effect
+from models.news import News
+from tests.conftest import user_id
+from utils import auth_utils, cache as cache_module, http_cache
+from utils.cache import MemoryCache, RedisCache
+from utils.config import settings
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = pytest.importorskip("redis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", lambda url, **options: fakeredis.FakeRedis(server=server))
+    backend = RedisCache("redis://test")
+    backend.server = server
+    return backend
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryCache(100)
+    return request.getfixturevalue("redis_cache")
+
+
+@pytest.fixture(params=["single-worker memory", "redis"])
+def shared_cache(request, monkeypatch):
+    # the app's cache swapped for one whose versions every worker would see
+    if request.param == "redis":
+        shared = request.getfixturevalue("redis_cache")
+    else:
+        shared = MemoryCache(1000)
+        monkeypatch.setattr(settings, "single_worker", True)
+    for module in (cache_module, http_cache, auth_utils):
+        monkeypatch.setattr(module, "cache", shared)
+    return shared
+
+
+@pytest.fixture
+def unshared_cache(monkeypatch):
+    # the default: a memory cache in one of several workers
+    memory = MemoryCache(1000)
+    monkeypatch.setattr(settings, "single_worker", False)
+    for module in (cache_module, http_cache, auth_utils):
+        monkeypatch.setattr(module, "cache", memory)
+    return memory
+
+
+def test_get_set_and_expiry(backend):
+    backend.set("key", {"value": 1}, 60)
+    assert backend.get("key") == {"value": 1}
+    backend.set("short", 1, 0.05)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_add_keeps_the_existing_value(backend):
+    backend.add("key", 1, 60)
+    backend.add("key", 2, 60)
+    assert backend.get("key") == 1
+
+
+def test_bump_version_changes_the_version(backend):
+    version = backend.version("user:1:version")
+    assert backend.version("user:1:version") == version
+    backend.bump_version("user:1:version")
+    assert backend.version("user:1:version") == version + 1
+
+
+def test_clear(backend):
+    backend.set("a", 1, 60)
+    backend.version("b")
+    backend.clear()
+    assert backend.get("a") is None and backend.get("b") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(2)
+    memory.set("a", 1, 60)
+    memory.set("b", 2, 60)
+    memory.get("a")
+    memory.set("c", 3, 60)
+    assert memory.get("a") == 1 and memory.get("b") is None and memory.get("c") == 3
+
+
+def test_only_redis_is_shared(redis_cache):
+    assert redis_cache.shared and not MemoryCache(1).shared
+
+
+def test_unreachable_redis_is_a_miss(redis_cache):
+    redis_cache.set("key", 1, 60)
+    redis_cache.server.connected = False
+    assert redis_cache.get("key") is None
+    redis_cache.set("key", 2, 60)
+    redis_cache.bump_version("version")
+    # every read of an unknown version differs, so no etag or cached body can match it
+    assert redis_cache.version("version") != redis_cache.version("version")
+    redis_cache.server.connected = True
+    assert redis_cache.get("key") == 1
+
+
+def test_requests_are_served_while_redis_is_down(client, user_headers, redis_cache, monkeypatch):
+    for module in (cache_module, http_cache, auth_utils):
+        monkeypatch.setattr(module, "cache", redis_cache)
+    redis_cache.server.connected = False
+    new_day(client, user_headers, "2024-05-01")
+    assert client.get("/days", headers=user_headers).status_code == 200
+    assert client.get("/effects", headers=user_headers).status_code == 200
+
+
+def new_day(client, headers, date: str) -> int:
+    response = client.post("/days/new", json={"date": date, "red": 1, "green": 2, "blue": 3, "rate": 3}, headers=headers)
+    assert response.status_code == 201
+    return client.get(f"/days/date?date={date[8:]}/{date[5:7]}/{date[:4]}", headers=headers).json()["id"]
+
+
+def test_day_writes_invalidate_the_days_list(client, user_headers, shared_cache):
+    version_key = http_cache.user_version_key(user_id(user_headers))
+    new_day(client, user_headers, "2024-01-01")
+    first = client.get("/days", headers=user_headers)
+    assert len(first.json()) == 1
+    assert client.get("/days", headers={**user_headers, "If-None-Match": first.headers["etag"]}).status_code == 304
+
+    version = shared_cache.version(version_key)
+    day_id = new_day(client, user_headers, "2024-01-02")
+    assert shared_cache.version(version_key) > version
+    second = client.get("/days", headers={**user_headers, "If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200 and len(second.json()) == 2
+
+    client.put(f"/days/id/{day_id}", json={"red": 9, "green": 9, "blue": 9, "rate": 1}, headers=user_headers)
+    assert [row["day"]["red"] for row in client.get("/days", headers=user_headers).json()] == [1, 9]
+    client.delete(f"/days/id/{day_id}", headers=user_headers)
+    assert len(client.get("/days", headers=user_headers).json()) == 1
+
+
+def test_effect_writes_invalidate_averages_and_etags(client, user_headers, shared_cache):
+    day_id = new_day(client, user_headers, "2024-02-01")
+    assert client.get(f"/effects/avg?foreign_key={day_id}", headers=user_headers).json() is None
+    listed = client.get("/effects", headers=user_headers)
+    assert client.get("/effects", headers={**user_headers, "If-None-Match": listed.headers["etag"]}).status_code == 304
+
+    effect = {"time": "9:30", "rate": 4, "description": "went for a walk", "foreign_key": day_id}
+    assert client.post("/effects/new", json=effect, headers=user_headers).status_code == 201
+    assert client.get(f"/effects/avg?foreign_key={day_id}", headers=user_headers).json() == 4
+    assert client.get("/effects", headers={**user_headers, "If-None-Match": listed.headers["etag"]}).status_code == 200
+
+    effect_id = client.get("/effects", headers=user_headers).json()[0]["id"]
+    client.post("/effects/batch", json=[{**effect, "rate": 2}], headers=user_headers)
+    assert client.get(f"/effects/avg?foreign_key={day_id}", headers=user_headers).json() == 3
+    client.delete(f"/effects/id/{effect_id}", headers=user_headers)
+    assert client.get(f"/effects/avg?foreign_key={day_id}", headers=user_headers).json() == 2
+
+
+def test_admin_writes_invalidate_news_and_user_versions(client, user_headers, admin_headers, shared_cache):
+    before = client.get("/news", headers=user_headers)
+    news = {"title": "cache test", "description": "checking that the news list is built again"}
+    assert client.post("/admin/news", json=news, headers=admin_headers).status_code == 201
+    after = client.get("/news", headers={**user_headers, "If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200 and len(after.json()) == len(before.json()) + 1
+    news_id = after.json()[-1]["id"]
+    client.delete(f"/admin/news/{news_id}", headers=admin_headers)
+    assert client.get(f"/news/{news_id}", headers=user_headers).status_code == 404
+
+    version_key = http_cache.user_version_key(user_id(user_headers))
+    version = shared_cache.version(version_key)
+    assert client.delete(f"/admin/users/{user_id(user_headers)}", headers=admin_headers).status_code == 204
+    assert shared_cache.version(version_key) > version
+
+
+def test_unshared_cache_never_serves_a_stale_body(client, user_headers, unshared_cache):
+    day_id = new_day(client, user_headers, "2024-03-01")
+    listed = client.get("/days", headers=user_headers)
+    effects = client.get("/effects", headers=user_headers)
+    # without shared versions the etag is hashed from the body, an unchanged list still gets its 304
+    assert client.get("/effects", headers={**user_headers, "If-None-Match": effects.headers["etag"]}).status_code == 304
+    # a day and an effect written by another worker, whose version bump this worker's memory cache never sees
+    owner = user_id(user_headers)
+    with shard_router.engine_for(owner).begin() as conn:
+        conn.execute(insert(Day.__table__), {"date": datetime.date(2024, 3, 2), "red": 1, "green": 1, "blue": 1, "rate": 1,
+                                             "auto_rate": False, "owner": owner})
+        conn.execute(insert(Effect.__table__), {"time": "9:00", "rate": 1, "description": "written elsewhere",
+                                                "foreign_key": day_id, "owner": owner})
+    again = client.get("/days", headers={**user_headers, "If-None-Match": listed.headers["etag"]})
+    assert again.status_code == 200 and len(again.json()) == 2
+    again = client.get("/effects", headers={**user_headers, "If-None-Match": effects.headers["etag"]})
+    assert again.status_code == 200 and len(again.json()) == len(effects.json()) + 1
+
+
+def test_unshared_cache_keeps_news_briefly(client, user_headers, unshared_cache, monkeypatch):
+    before = client.get("/news", headers=user_headers).json()
+    # news posted through another worker stays out of this worker's copy until news_local_cache_ttl runs out
+    with engine.begin() as conn:
+        conn.execute(insert(News.__table__), {"title": "elsewhere", "description": "posted through another worker"})
+    assert len(client.get("/news", headers=user_headers).json()) == len(before)
+    monkeypatch.setattr(settings, "news_local_cache_ttl", 0)
+    assert len(client.get("/news", headers=user_headers).json()) == len(before) + 1
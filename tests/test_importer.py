@@ -0,0 +1,66 @@
+import json
+
+from utils.importer import HistoryImport
+
+
+def upload(client, headers, content: bytes, import_format: str = "jsonl"):
+    return client.post(
+        "/account/import", headers=headers, params={"format": import_format},
+        files={"file": (f"history.{import_format}", content)},
+    )
+
+
+def test_invalid_utf8_line_is_a_row_error(client, user_headers):
+    lines = [
+        json.dumps({"id": 1, "date": "01/01/2024", "red": 1, "green": 2, "blue": 3, "rate": 3, "effects": []}).encode(),
+        b'{"id": 2, "date": "02/01/2024", "red": 1, "green": 2, "blue": 3, "rate": 3, "effects": [{"description": "caf\xe9"}]}',
+        json.dumps({"id": 3, "date": "03/01/2024", "red": 1, "green": 2, "blue": 3, "rate": 3, "effects": []}).encode(),
+    ]
+    response = upload(client, user_headers, b"\xef\xbb\xbf" + b"\n".join(lines))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["days"] == 2
+    assert body["errors"] == [{"line": 2, "error": "the line is not valid UTF-8"}]
+
+
+def test_invalid_utf8_csv_row_is_a_row_error(client, user_headers):
+    content = (
+        b"day_id,date,red,green,blue,rate,auto_rate,effect_id,time,effect_rate,description\n"
+        b"1,01/02/2024,1,2,3,4,true,,,,\n"
+        b'2,02/02/2024,1,2,3,4,true,,10:00,3,"two\nlines \xff"\n'
+        b"3,03/02/2024,1,2,3,4,true,,,,\n"
+    )
+    response = upload(client, user_headers, content, "csv")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["days"] == 2
+    assert body["errors"] == [{"line": 4, "error": "the line is not valid UTF-8"}]
+
+
+def test_day_stored_during_the_import_is_a_row_error(client, user_headers, monkeypatch):
+    def day_line(day: int) -> str:
+        return json.dumps({"id": day, "date": f"{day:02}/03/2024", "red": 1, "green": 2, "blue": 3, "rate": 3,
+                           "effects": [{"time": "10:00", "rate": 2, "description": "a long walk"}]})
+
+    assert upload(client, user_headers, day_line(2).encode()).json()["days"] == 1
+    validate_days = HistoryImport.validate_days
+
+    def racing_validate_days(self, rows):
+        # the first look misses the day above, as if another request stored it right after
+        if getattr(self, "raced", False):
+            return validate_days(self, rows)
+        self.raced, owner, self.owner = True, self.owner, 0
+        try:
+            return validate_days(self, rows)
+        finally:
+            self.owner = owner
+
+    monkeypatch.setattr(HistoryImport, "validate_days", racing_validate_days)
+    response = upload(client, user_headers, "\n".join(day_line(day) for day in range(1, 4)).encode())
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["days"], body["effects"]) == (2, 2)
+    assert body["errors"] == [
+        {"line": 2, "error": "a day for 2024-03-02 already exists"},
+        {"line": 2, "error": "the day of this effect was not imported"},
+    ]
@@ -0,0 +1,92 @@
+import json
+import random
+
+import pytest
+from sqlmodel import Session
+
+from database.shards import shard_router
+from tests.conftest import user_id
+from utils.month_summaries import find_stale_month_summaries
+
+
+def random_date(rng: random.Random) -> str:
+    return f"2024-{rng.randint(1, 4):02d}-{rng.randint(1, 28):02d}"
+
+
+def random_color(rng: random.Random) -> dict:
+    return {"red": rng.randint(0, 255), "green": rng.randint(0, 255), "blue": rng.randint(0, 255),
+            "rate": rng.randint(0, 4), "auto_rate": False}
+
+
+def random_effect(rng: random.Random, day_id: int) -> dict:
+    return {"time": f"{rng.randint(0, 23)}:{rng.randint(0, 59):02d}", "rate": rng.randint(0, 4),
+            "description": "something happened", "foreign_key": day_id}
+
+
+def random_write(client, headers: dict, rng: random.Random):
+    days = [row["day"]["id"] for row in client.get("/days", headers=headers).json()]
+    effects = [effect["id"] for effect in client.get("/effects", headers=headers).json()]
+    operations = ["day", "days", "import", "effect", "effects"] * 3
+    if days:
+        operations += ["update day", "update days", "delete day", "delete days", "delete day effects", "effect", "effects"]
+    if effects:
+        operations += ["update effect", "update effects", "delete effect", "delete effects"]
+    operations += ["delete all days", "delete all effects", "delete data"]
+    operation = rng.choice(operations)
+    if operation == "day":
+        return client.post("/days/new", json={"date": random_date(rng), **random_color(rng)}, headers=headers)
+    if operation == "days":
+        return client.post("/days/batch", json=[{"date": random_date(rng), **random_color(rng)} for _ in range(4)], headers=headers)
+    if operation == "import":
+        lines = [json.dumps({"date": random_date(rng), **random_color(rng),
+                             "effects": [random_effect(rng, 1) for _ in range(rng.randint(0, 3))]}) for _ in range(3)]
+        return client.post("/account/import", files={"file": ("history.jsonl", "\n".join(lines))}, headers=headers)
+    if operation == "update day":
+        return client.put(f"/days/id/{rng.choice(days)}", json=random_color(rng), headers=headers)
+    if operation == "update days":
+        return client.put("/days/batch", json=[{"id": rng.choice(days + [10 ** 6]), **random_color(rng)} for _ in range(3)],
+                          headers=headers)
+    if operation == "delete day":
+        return client.delete(f"/days/id/{rng.choice(days)}", headers=headers)
+    if operation == "delete days":
+        return client.request("DELETE", "/days/batch", json=rng.sample(days, min(3, len(days))), headers=headers)
+    if operation == "delete day effects":
+        return client.delete(f"/effects/foreign_key/{rng.choice(days)}", headers=headers)
+    if operation == "effect":
+        return client.post("/effects/new", json=random_effect(rng, rng.choice(days)), headers=headers) if days else None
+    if operation == "effects":
+        return client.post("/effects/batch", json=[random_effect(rng, rng.choice(days + [10 ** 6])) for _ in range(4)],
+                           headers=headers) if days else None
+    if operation == "update effect":
+        effect = random_effect(rng, 1)
+        del effect["foreign_key"]
+        return client.put(f"/effects/id/{rng.choice(effects)}", json=effect, headers=headers)
+    if operation == "update effects":
+        return client.put("/effects/batch", json=[{"id": rng.choice(effects), **random_effect(rng, 1)} for _ in range(3)],
+                          headers=headers)
+    if operation == "delete effect":
+        return client.delete(f"/effects/id/{rng.choice(effects)}", headers=headers)
+    if operation == "delete effects":
+        return client.request("DELETE", "/effects/batch", json=rng.sample(effects, min(3, len(effects))), headers=headers)
+    if operation == "delete all days":
+        return client.delete("/days", headers=headers)
+    if operation == "delete all effects":
+        return client.delete("/effects", headers=headers)
+    return client.delete("/account/data", headers=headers)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_month_summaries_match_a_recomputation(client, user_headers, seed):
+    # every write path keeps the stored sums in step, checked against sums computed from scratch after each write
+    rng = random.Random(seed)
+    owner = user_id(user_headers)
+    engine = shard_router.engine_for(owner)
+    for step in range(60):
+        response = random_write(client, user_headers, rng)
+        if response is None:
+            continue
+        assert response.status_code < 500, response.text
+        with Session(engine) as db:
+            # other tests share the database and may write rows straight into it, only this user's months count
+            stale = [row for rows in find_stale_month_summaries(db) for row in rows if row.owner == owner]
+        assert stale == [], f"after step {step}: {response.request.method} {response.request.url}"
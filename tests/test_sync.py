@@ -0,0 +1,39 @@
+def sync_pages(client, headers: dict, **params) -> list[dict]:
+    pages, cursor = [], None
+    while True:
+        response = client.get("/sync", params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        assert pages[-1]["has_more"] == (cursor is not None)
+        if cursor is None:
+            return pages
+
+
+def test_incremental_sync_is_paged(client, user_headers):
+    since = client.get("/sync", headers=user_headers).json()["cursor"]
+    assert since.endswith("Z")
+    days = client.post("/days/batch", json=[
+        {"date": f"2024-01-{day:02d}", "red": 1, "green": 2, "blue": 3, "rate": 3} for day in range(1, 8)
+    ], headers=user_headers).json()
+    day_ids = [day["id"] for day in days]
+    effects = client.post("/effects/batch", json=[
+        {"time": "9:30", "rate": 2, "description": "walking here", "foreign_key": day_id} for day_id in day_ids + day_ids
+    ], headers=user_headers).json()
+    client.delete(f"/effects/id/{effects[-1]['id']}", headers=user_headers)
+    client.delete(f"/days/id/{day_ids[0]}", headers=user_headers)
+
+    pages = sync_pages(client, user_headers, since=since, limit=3)
+    assert all(len(page["days"]) + len(page["effects"]) + len(page["deleted_days"]) + len(page["deleted_effects"]) <= 3
+               for page in pages)
+    assert pages[0]["cursor"].endswith("Z")
+    assert all(page["cursor"] is None for page in pages[1:])
+    assert sorted(day["id"] for page in pages for day in page["days"]) == day_ids[1:]
+    # the effects of the deleted day went with it, the rest are listed once each
+    assert len([effect for page in pages for effect in page["effects"]]) == 11
+    assert [day_id for page in pages for day_id in page["deleted_days"]] == [day_ids[0]]
+    assert [effect_id for page in pages for effect_id in page["deleted_effects"]] == [effects[-1]["id"]]
+
+    # without a limit the same changes come back in one page
+    [page] = sync_pages(client, user_headers, since=since)
+    assert (len(page["days"]), len(page["effects"]), page["deleted_days"]) == (6, 11, [day_ids[0]])
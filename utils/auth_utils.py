@@ -1,22 +1,43 @@
+import hashlib
+import time
+
 from jose import jwt, JWTError
 from starlette import status
-from utils.pass_crypt import bcrypt_context
-from di.injection import db_dependency, token_dependency
+from utils.pass_crypt import verify_password
+from di.injection import db_dependency, read_db_dependency, token_dependency
 from models.User import User
 from datetime import timedelta, datetime, timezone
 from fastapi import HTTPException
-from dotenv import load_dotenv
-import os
+from utils.cache import cache
+from utils.config import settings
+
+
+def token_cache_key(token: str) -> str:
+    # verified claims keyed by the token's sha256, so repeat requests with the same token skip signature checks
+    return "token:" + hashlib.sha256(token.encode()).hexdigest()
+
 
-load_dotenv()
+def auth_version_key(user_id: int) -> str:
+    # bumped when the user is deleted, claims cached under an older version are checked against the user table again
+    return f"user:{user_id}:auth"
+
+
+def revoke_user_tokens(user_id: int):
+    # tokens of a deleted user stop working once their cached claims are checked against the user table again
+    cache.bump_version(auth_version_key(user_id))
 
 
 def authenticate_user(username: str, password: str, db: db_dependency):
     requested_user: User = db.query(User).filter(User.username == username).first()
     if not requested_user:
         return False
-    if not bcrypt_context.verify(password, requested_user.password):
+    valid, new_hash = verify_password(password, requested_user.password)
+    if not valid:
         return False
+    if new_hash:
+        requested_user.password = new_hash
+        db.add(requested_user)
+        db.commit()
     return requested_user
 
 
@@ -24,18 +45,31 @@ def create_access_token(username: str, user_id: int, user_role: str, expires_del
     encode = {'sub': username, 'id': user_id, 'role': user_role}
     expires = datetime.now(timezone.utc) + expires_delta
     encode.update({'exp': expires})
-    return jwt.encode(encode, os.getenv("SECRET_KEY"), algorithm=os.getenv("ALGORITHM"))
+    return jwt.encode(encode, settings.secret_key, algorithm=settings.algorithm)
 
 
-async def get_current_user(token: token_dependency):
+def get_current_user(token: token_dependency, db: read_db_dependency):
+    # a plain def so fastapi runs it in the worker pool, the cache lookup can be a network call to redis
+    cache_key = token_cache_key(token)
+    cached_user = cache.get(cache_key)
+    if cached_user is not None:
+        cached_user = dict(cached_user)
+        if cached_user.pop("auth", None) == cache.version(auth_version_key(cached_user["id"])):
+            return cached_user
     try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=[os.getenv("ALGORITHM")])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         user_role: str = payload.get('role')
         if username is None or user_id is None or user_role is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials")
-        return {"username": username, "id": user_id, 'role': user_role}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials")
-
+    # the token outlives an account that was deleted, its claims are only taken while the user row is still there.
+    # the version is read first, so a deletion committed after the lookup still makes the next request look again
+    version = cache.version(auth_version_key(user_id))
+    if db.query(User.id).filter(User.id == user_id).first() is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Credentials")
+    current_user = {"username": username, "id": user_id, 'role': user_role}
+    cache.set(cache_key, {**current_user, "auth": version}, min(payload.get('exp', 0) - time.time(), settings.token_cache_ttl))
+    return current_user
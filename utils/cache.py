@@ -0,0 +1,164 @@
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# version keys outlive the entries they guard, incrementing one invalidates everything built under the old value
+version_ttl = 30 * 24 * 3600
+
+
+class CacheBackend:
+    # whether every worker sees the same entries, only then can a version bumped by one worker be trusted by another
+    shared = False
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float):
+        raise NotImplementedError
+
+    def add(self, key: str, value, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def version(self, key: str) -> int:
+        value = self.get(key)
+        if value is None:
+            # a random starting point keeps a flushed cache from handing out versions (and etags) seen before
+            self.add(key, random.getrandbits(48), version_ttl)
+            value = self.get(key)
+        if value is None:
+            # the cache is unreachable, a version nobody has seen matches no etag and no cached body
+            return random.getrandbits(48)
+        return int(value)
+
+    def bump_version(self, key: str):
+        self.version(key)
+        self.incr(key)
+
+
+class MemoryCache(CacheBackend):
+    # bounded LRU where every entry also carries its own absolute expiry time
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _get_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set_entry(self, key, value, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._get_entry(key)
+            return None if entry is None else entry[0]
+
+    def set(self, key: str, value, ttl: float):
+        if self.max_size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._set_entry(key, value, time.time() + ttl)
+
+    def add(self, key: str, value, ttl: float):
+        with self._lock:
+            if self._get_entry(key) is None:
+                self._set_entry(key, value, time.time() + ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._get_entry(key)
+            value, expires_at = (0, time.time() + version_ttl) if entry is None else entry
+            self._set_entry(key, int(value) + 1, expires_at)
+            return int(value) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    # values are stored as json, so everything cached has to stay json serializable
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "mymood:"):
+        # imported only when redis is configured, it adds close to 100 ms to every worker's boot
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at redis but the redis package is not installed") from None
+        self.client = redis.Redis.from_url(url, socket_timeout=settings.cache_timeout,
+                                           socket_connect_timeout=settings.cache_timeout)
+        self.prefix = prefix
+        self.unavailable = (redis.ConnectionError, redis.TimeoutError)
+
+    def _call(self, command: str, *args, **kwargs):
+        # an unreachable redis turns into a miss (None) instead of failing the request; a version bump lost this way
+        # leaves bodies cached before the outage in place until their ttl runs out
+        try:
+            return getattr(self.client, command)(*args, **kwargs)
+        except self.unavailable as error:
+            logger.warning("cache %s of %r failed: %s", command, args[0] if args else None, error)
+            return None
+
+    def get(self, key: str):
+        value = self._call("get", self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value, ttl: float):
+        if ttl > 0:
+            self._call("set", self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def add(self, key: str, value, ttl: float):
+        self._call("set", self.prefix + key, json.dumps(value), px=int(ttl * 1000), nx=True)
+
+    def delete(self, key: str):
+        self._call("delete", self.prefix + key)
+
+    def incr(self, key: str) -> int | None:
+        return self._call("incr", self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def create_cache(url: str | None) -> CacheBackend:
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    return MemoryCache(settings.cache_size)
+
+
+# without CACHE_URL every worker has a memory cache of its own: fine for tokens, but version etags and long lived
+# bodies need SINGLE_WORKER=true to say there are no other workers to miss an invalidation. otherwise news bodies are
+# kept for NEWS_LOCAL_CACHE_TTL seconds and etags are hashed from each body (see http_cache)
+cache = create_cache(settings.cache_url)
@@ -0,0 +1,78 @@
+import os
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+
+class Settings(BaseModel):
+    secret_key: str
+    algorithm: str
+    first_admin_username: str | None = None
+    first_admin_password: str | None = None
+    database_url: str = "sqlite:///database.db"
+    database_read_url: str | None = None
+    sqlite_read_pool: bool = True
+    db_worker_threads: int = 40
+    db_pool_size: int | None = None
+    db_max_overflow: int = 10
+    sqlite_busy_timeout: int = 15000
+    sqlite_cache_size: int = 20_000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    cache_url: str | None = None
+    cache_timeout: float = 0.5
+    single_worker: bool = False
+    cache_size: int = 20_000
+    token_cache_ttl: int = 300
+    news_cache_ttl: int = 3600
+    # news bodies are still kept this long in each worker when the cache is not shared, an edit reaches the other
+    # workers within it
+    news_local_cache_ttl: int = 10
+    user_cache_ttl: int = 600
+    tombstone_retention_days: int = 90
+    bcrypt_rounds: int = 12
+    hash_workers: int | None = None
+    metrics_enabled: bool = True
+    slow_query_ms: int = 200
+    n_plus_one_threshold: int = 10
+    auto_migrate: bool = False
+    shard_urls: list[str] = []
+    shard_virtual_nodes: int = 128
+
+
+def load_settings() -> Settings:
+    load_dotenv()
+    return Settings(
+        secret_key=os.getenv("SECRET_KEY"),
+        algorithm=os.getenv("ALGORITHM"),
+        first_admin_username=os.getenv("FIRST-ADMIN-USERNAME"),
+        first_admin_password=os.getenv("FIRST-ADMIN-PASSWORD"),
+        database_url=os.getenv("DATABASE_URL", "sqlite:///database.db"),
+        database_read_url=os.getenv("DATABASE_READ_URL"),
+        sqlite_read_pool=os.getenv("SQLITE_READ_POOL", True),
+        db_worker_threads=os.getenv("DB_WORKER_THREADS", 40),
+        db_pool_size=os.getenv("DB_POOL_SIZE"),
+        db_max_overflow=os.getenv("DB_MAX_OVERFLOW", 10),
+        sqlite_busy_timeout=os.getenv("SQLITE_BUSY_TIMEOUT", 15000),
+        sqlite_cache_size=os.getenv("SQLITE_CACHE_SIZE", 20_000),
+        sqlite_mmap_size=os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        cache_url=os.getenv("CACHE_URL"),
+        cache_timeout=os.getenv("CACHE_TIMEOUT", 0.5),
+        single_worker=os.getenv("SINGLE_WORKER", False),
+        cache_size=os.getenv("CACHE_SIZE", 20_000),
+        token_cache_ttl=os.getenv("TOKEN_CACHE_TTL", 300),
+        news_cache_ttl=os.getenv("NEWS_CACHE_TTL", 3600),
+        news_local_cache_ttl=os.getenv("NEWS_LOCAL_CACHE_TTL", 10),
+        user_cache_ttl=os.getenv("USER_CACHE_TTL", 600),
+        tombstone_retention_days=os.getenv("TOMBSTONE_RETENTION_DAYS", 90),
+        bcrypt_rounds=os.getenv("BCRYPT_ROUNDS", 12),
+        hash_workers=os.getenv("HASH_WORKERS"),
+        metrics_enabled=os.getenv("METRICS_ENABLED", True),
+        slow_query_ms=os.getenv("SLOW_QUERY_MS", 200),
+        n_plus_one_threshold=os.getenv("N_PLUS_ONE_THRESHOLD", 10),
+        auto_migrate=os.getenv("AUTO_MIGRATE", False),
+        shard_urls=[url.strip() for url in os.getenv("SHARD_URLS", "").split(",") if url.strip()],
+        shard_virtual_nodes=os.getenv("SHARD_VIRTUAL_NODES", 128),
+    )
+
+
+settings = load_settings()
@@ -1,10 +1,17 @@
 from fastapi.security import OAuth2PasswordBearer
 
 
-database_url = "sqlite:///database.db"
-
 date_regex_pattern = r"^(0[1-9]|[12][0-9]|3[01])/(0[1-9]|1[0-2])/([0-9]{4})$"
 
+date_format = "%d/%m/%Y"
+
+batch_size_limit = 1000
+
+# a calendar screen asks for at most a year of days at once
+overview_days_limit = 366
+
+month_regex_pattern = r"^[0-9]{4}-(0[1-9]|1[0-2])$"
+
 time_regex_pattern = r"^([01]?[0-9]|2[0-3]):([0-5]?[0-9])$"
 
 oauth2bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
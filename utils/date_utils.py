@@ -0,0 +1,18 @@
+import datetime
+
+from utils.constants import date_format
+
+
+def parse_date(value: str) -> datetime.date:
+    return datetime.datetime.strptime(value, date_format).date()
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def as_utc(value: datetime.datetime) -> datetime.datetime:
+    # naive values coming from clients are taken to be utc already
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
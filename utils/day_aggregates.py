@@ -0,0 +1,48 @@
+from sqlalchemy import text
+from sqlmodel import Session
+
+from models.days import Day
+from utils.month_summaries import add_effects_to_month
+
+# day.effect_count / day.effect_rate_sum are kept in step with the effect table by every effect write path
+effect_count_sql = "SELECT count(*) FROM effect WHERE effect.owner = day.owner AND effect.foreign_key = day.id"
+effect_rate_sum_sql = "SELECT coalesce(sum(effect.rate), 0) FROM effect WHERE effect.owner = day.owner AND effect.foreign_key = day.id"
+
+
+def add_effects_to_day(db: Session, owner: int, day_id: int, count: int, rate_sum: int) -> int:
+    updated = (
+        db.query(Day)
+        .filter(Day.owner == owner)
+        .filter(Day.id == day_id)
+        .update({Day.effect_count: Day.effect_count + count, Day.effect_rate_sum: Day.effect_rate_sum + rate_sum},
+                synchronize_session=False)
+    )
+    if updated and (count or rate_sum):
+        add_effects_to_month(db, owner, day_id, count, rate_sum)
+    return updated
+
+
+def add_effect_totals(db: Session, owner: int, totals: dict):
+    # totals maps day id -> (count delta, rate sum delta)
+    for day_id, (count, rate_sum) in totals.items():
+        add_effects_to_day(db, owner, day_id, count, rate_sum)
+
+
+def day_average(day: Day) -> float | None:
+    if not day.effect_count:
+        return None
+    return day.effect_rate_sum / day.effect_count
+
+
+def rebuild_day_aggregates(db) -> int:
+    # db is a Session or a Connection, the migration that adds the columns runs this too
+    result = db.execute(text(f"UPDATE day SET effect_count = ({effect_count_sql}), effect_rate_sum = ({effect_rate_sum_sql})"))
+    return result.rowcount
+
+
+def find_stale_day_aggregates(db) -> list:
+    return db.execute(text(
+        f"SELECT id, owner, effect_count, effect_rate_sum, ({effect_count_sql}) AS actual_count, "
+        f"({effect_rate_sum_sql}) AS actual_rate_sum FROM day "
+        f"WHERE effect_count != ({effect_count_sql}) OR effect_rate_sum != ({effect_rate_sum_sql})"
+    )).all()
@@ -0,0 +1,26 @@
+from sqlalchemy import select
+from sqlmodel import Session
+
+from models.days import Day
+from utils.month_summaries import remove_days_from_months
+from utils.tombstones import record_tombstones
+
+# a large account is deleted this many days per transaction, other writers get the write lock in between
+delete_chunk_size = 2000
+
+
+def delete_days(db: Session, owner: int, day_query) -> int:
+    # day_query is a Day query filtered to the rows to delete, their effects go with them through ON DELETE CASCADE
+    record_tombstones(db, day_query)
+    remove_days_from_months(db, owner, day_query)
+    return day_query.delete(synchronize_session=False)
+
+
+def delete_days_in_chunks(db: Session, owner: int, on_commit=None) -> int:
+    deleted = 0
+    while day_ids := db.scalars(select(Day.id).where(Day.owner == owner).limit(delete_chunk_size)).all():
+        deleted += delete_days(db, owner, db.query(Day).filter(Day.owner == owner).filter(Day.id.in_(day_ids)))
+        db.commit()
+        if on_commit:
+            on_commit()
+    return deleted
@@ -0,0 +1,135 @@
+import csv
+import importlib.util
+import io
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import select
+from sqlmodel import Session
+
+from models.days import Day
+from models.effects import Effect
+from utils.pagination import stream_chunk_size
+
+# pyarrow takes a while to import and only the columnar formats use it, it is loaded by the first such export
+has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+
+day_fields = ["id", "date", "red", "green", "blue", "rate", "auto_rate"]
+
+# csv has no nesting, so it gets one row per (day, effect) pair and a day without effects leaves the effect columns empty
+csv_columns = ["day_id", "date", "red", "green", "blue", "rate", "auto_rate", "effect_id", "time", "effect_rate", "description"]
+
+media_types = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+columnar_formats = {"arrow", "parquet"}
+
+
+def history_statement(owner: int):
+    # one pass ordered by date then effect id, the effects of a day arrive right after it and nothing is grouped in memory
+    return (
+        select(Day.id, Day.date, Day.red, Day.green, Day.blue, Day.rate, Day.auto_rate,
+               Effect.id.label("effect_id"), Effect.time, Effect.rate.label("effect_rate"), Effect.description)
+        .outerjoin(Effect, (Effect.owner == Day.owner) & (Effect.foreign_key == Day.id))
+        .where(Day.owner == owner)
+        .order_by(Day.date, Effect.id)
+    )
+
+
+def history_rows(bind, owner: int):
+    # the request session may be closed before the body is sent, so the export reads through its own session
+    with Session(bind) as db:
+        yield from db.connection().execute(history_statement(owner).execution_options(yield_per=stream_chunk_size))
+
+
+def history_days(bind, owner: int):
+    for _, rows in groupby(history_rows(bind, owner), key=itemgetter(0)):
+        first = next(rows)
+        day = dict(zip(day_fields, first[:7]))
+        day["effects"] = [
+            {"id": effect_id, "time": time, "rate": rate, "description": description}
+            for *_, effect_id, time, rate, description in (first, *rows) if effect_id is not None
+        ]
+        yield day
+
+
+def chunked(items, size: int = stream_chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def jsonl_export(bind, owner: int):
+    for days in chunked(history_days(bind, owner)):
+        yield "".join(json.dumps(day, default=str, separators=(",", ":")) + "\n" for day in days)
+
+
+def csv_export(bind, owner: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(csv_columns)
+    for rows in chunked(history_rows(bind, owner)):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def arrow_schema(pyarrow):
+    return pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("date", pyarrow.date32()),
+        ("red", pyarrow.int16()),
+        ("green", pyarrow.int16()),
+        ("blue", pyarrow.int16()),
+        ("rate", pyarrow.int8()),
+        ("auto_rate", pyarrow.bool_()),
+        ("effects", pyarrow.list_(pyarrow.struct([
+            ("id", pyarrow.int64()),
+            ("time", pyarrow.string()),
+            ("rate", pyarrow.int8()),
+            ("description", pyarrow.string()),
+        ]))),
+    ])
+
+
+def columnar_export(bind, owner: int, export_format: str):
+    # the writer appends to an in-memory sink which is drained after every record batch / row group
+    import pyarrow
+    import pyarrow.parquet
+    schema = arrow_schema(pyarrow)
+    sink = io.BytesIO()
+    if export_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_table
+        to_chunk = pyarrow.Table.from_pylist
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema, options=pyarrow.ipc.IpcWriteOptions(compression="zstd"))
+        write = writer.write_batch
+        to_chunk = pyarrow.RecordBatch.from_pylist
+    for days in chunked(history_days(bind, owner), stream_chunk_size * 10):
+        write(to_chunk(days, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+def export_history(bind, owner: int, export_format: str):
+    if export_format == "jsonl":
+        return jsonl_export(bind, owner)
+    if export_format == "csv":
+        return csv_export(bind, owner)
+    return columnar_export(bind, owner, export_format)
@@ -0,0 +1,107 @@
+import hashlib
+
+from fastapi import Request, Response
+
+from utils.cache import cache
+from utils.config import settings
+from utils.responses import dump_json, json_response
+
+news_version_key = "news:version"
+
+
+def user_version_key(user_id: int) -> str:
+    return f"user:{user_id}:version"
+
+
+def versions_shared() -> bool:
+    # a version bumped in one worker's memory cache is invisible to the others, so versions only back etags and cached
+    # bodies when they live in redis (CACHE_URL) or the app runs as one process (SINGLE_WORKER=true)
+    return cache.shared or settings.single_worker
+
+
+def invalidate_news():
+    cache.bump_version(news_version_key)
+
+
+def bump_user_version(user_id: int):
+    cache.bump_version(user_version_key(user_id))
+
+
+def user_etag(user_id: int, request: Request) -> str:
+    # versions live in the shared cache, so every worker hands out the same etag for the same data
+    version = cache.version(user_version_key(user_id))
+    tag = f"{user_id}:{version}:{request.url.path}?{request.url.query}"
+    return f'"{hashlib.sha1(tag.encode()).hexdigest()}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def check_user_etag(user_id: int, request: Request, response: Response) -> Response | None:
+    # returns the 304 to send when the client's copy is current, otherwise tags the response being built
+    if not versions_shared():
+        return None
+    etag = user_etag(user_id, request)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return None
+
+
+def tagged_body(content, headers: dict) -> dict:
+    # kept as text, a redis backed cache stores its values as json
+    body = dump_json(content).decode()
+    digest = hashlib.sha1(body.encode())
+    digest.update(repr(sorted(headers.items())).encode())
+    return {"body": body, "etag": f'"{digest.hexdigest()}"', "headers": headers}
+
+
+def body_response(request: Request, tagged: dict) -> Response:
+    if is_not_modified(request, tagged["etag"]):
+        return not_modified(tagged["etag"])
+    return Response(tagged["body"], media_type="application/json",
+                    headers={**tagged["headers"], "ETag": tagged["etag"], "Cache-Control": "private, no-cache"})
+
+
+def cached_json_response(request: Request, key: str, build, ttl: int, local_ttl: int = 0) -> Response:
+    # build returns (content, headers), the key has to carry the version the content was read under. without shared
+    # versions the body is only kept for local_ttl, which is how stale another worker may serve it; the etag is hashed
+    # from the body, so a 304 stays correct either way
+    if not versions_shared():
+        ttl = local_ttl
+    cached = cache.get(key) if ttl > 0 else None
+    if cached is None:
+        cached = tagged_body(*build())
+        if ttl > 0:
+            cache.set(key, cached, ttl)
+    return body_response(request, cached)
+
+
+def user_json_response(request: Request, content, response: Response) -> Response:
+    # check_user_etag has already tagged the response when versions are shared, otherwise the etag is hashed from the
+    # body so the client still gets its 304
+    if versions_shared():
+        return json_response(content, response)
+    headers = {key: value for key, value in response.headers.items() if key.startswith("x-")}
+    return body_response(request, tagged_body(content, headers))
+
+
+def cached_news_response(request: Request, key: str, build) -> Response:
+    version = cache.version(news_version_key)
+    return cached_json_response(request, f"news:{version}:{key}", build, settings.news_cache_ttl,
+                                settings.news_local_cache_ttl)
+
+
+def cached_user_response(user_id: int, request: Request, key: str, build) -> Response:
+    # a user's own write may land on another worker, so their bodies are never kept without shared versions
+    version = cache.version(user_version_key(user_id))
+    return cached_json_response(request, f"user:{user_id}:{version}:{key}", build, settings.user_cache_ttl)
@@ -0,0 +1,238 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+from typing import NamedTuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from models.days import CreateDayRequest, Day
+from models.effects import CreateEffectRequest, Effect
+from utils.day_aggregates import add_effect_totals
+from utils.export import csv_columns
+from utils.month_summaries import add_days_to_months
+
+import_chunk_size = 2000
+import_chunk_attempts = 3
+
+# a file full of bad rows should not turn into an equally large response
+import_error_limit = 1000
+
+invalid_utf8_error = "the line is not valid UTF-8"
+
+day_fields = ["date", "red", "green", "blue", "rate", "auto_rate"]
+
+days_adapter = TypeAdapter(list[CreateDayRequest])
+effects_adapter = TypeAdapter(list[CreateEffectRequest])
+
+
+class ImportRow(NamedTuple):
+    line: int
+    day_key: str | None
+    day: dict | None
+    effects: list
+    error: str | None = None
+
+
+def decoded_lines(file, bad_lines: set):
+    # every line is decoded on its own so a stray byte fails the row it is in instead of the whole upload,
+    # such a line is passed on with replacement characters and its number kept in bad_lines
+    for line, raw in enumerate(file, start=1):
+        try:
+            yield raw.decode("utf-8-sig" if line == 1 else "utf-8")
+        except UnicodeDecodeError:
+            bad_lines.add(line)
+            yield raw.decode("utf-8", errors="replace")
+
+
+def jsonl_rows(stream, bad_lines: set = frozenset()):
+    # the export's jsonl: one day per line with its effects nested, the day id only ties the two together
+    for line, text in enumerate(stream, start=1):
+        if line in bad_lines:
+            yield ImportRow(line, None, None, [], invalid_utf8_error)
+            continue
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            effects = record.pop("effects", None) or []
+            if not isinstance(effects, list):
+                raise ValueError("effects must be a list")
+        except ValueError as error:
+            yield ImportRow(line, None, None, [], str(error))
+            continue
+        day_key = record.pop("id", None)
+        yield ImportRow(line, f"line:{line}" if day_key is None else str(day_key), record, effects)
+
+
+def csv_rows(stream, bad_lines: set = frozenset()):
+    # the export's csv: one row per (day, effect) pair, rows of the same day_id share one new day
+    reader = csv.DictReader(stream)
+    missing = set(csv_columns) - {"effect_id"} - set(reader.fieldnames or [])
+    if 1 in bad_lines:
+        yield ImportRow(1, None, None, [], invalid_utf8_error)
+        return
+    if missing:
+        yield ImportRow(1, None, None, [], f"missing columns: {', '.join(sorted(missing))}")
+        return
+    first_line = reader.line_num + 1
+    for row in reader:
+        # a quoted value can span lines, the row is bad when any line it was read from was
+        lines, first_line = range(first_line, reader.line_num + 1), reader.line_num + 1
+        if not bad_lines.isdisjoint(lines):
+            yield ImportRow(reader.line_num, None, None, [], invalid_utf8_error)
+            continue
+        day = {name: row[name] for name in day_fields}
+        effects = []
+        if row["description"] or row["effect_rate"]:
+            effects.append({"time": row["time"] or None, "rate": row["effect_rate"], "description": row["description"]})
+        yield ImportRow(reader.line_num, row["day_id"], day, effects)
+
+
+def validate(adapter: TypeAdapter, items: list) -> list:
+    # the whole batch is validated at once, only a batch with errors is split up to find which items failed
+    try:
+        return adapter.validate_python(items)
+    except ValidationError:
+        validated = []
+        for item in items:
+            try:
+                validated.append(adapter.validate_python([item])[0])
+            except ValidationError as error:
+                validated.append(error)
+        return validated
+
+
+def error_message(error) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(part) for part in detail['loc'][1:])}: {detail['msg']}" for detail in error.errors())
+    return str(error)
+
+
+class HistoryImport:
+    def __init__(self, db: Session, owner: int):
+        self.db = db
+        self.owner = owner
+        # file day key -> new Day.id, or None when that day was rejected
+        self.day_ids = {}
+        self.days = 0
+        self.effects = 0
+        self.error_count = 0
+        self.errors = []
+
+    def fail(self, line: int, error):
+        self.error_count += 1
+        if len(self.errors) < import_error_limit:
+            self.errors.append({"line": line, "error": error_message(error)})
+
+    def run(self, rows, on_commit=None, commit=True):
+        # with commit=False every chunk stays in the caller's transaction
+        rows = iter(rows)
+        while chunk := list(islice(rows, import_chunk_size)):
+            self.import_chunk(chunk)
+            if commit:
+                self.db.commit()
+                if on_commit:
+                    on_commit()
+        return {"days": self.days, "effects": self.effects, "error_count": self.error_count, "errors": self.errors}
+
+    def import_chunk(self, chunk: list[ImportRow]):
+        # validate_days only sees the days stored before it looked, a day another request stores in between fails the
+        # insert; the chunk is then rolled back to its savepoint and read again, which reports those dates as taken
+        day_ids, days, effects, error_count, errors = dict(self.day_ids), self.days, self.effects, self.error_count, list(self.errors)
+        for _ in range(import_chunk_attempts):
+            try:
+                with self.db.begin_nested():
+                    self.insert_chunk(chunk)
+                return
+            except IntegrityError:
+                self.day_ids, self.days, self.effects, self.error_count, self.errors = dict(day_ids), days, effects, error_count, list(errors)
+        for row in chunk:
+            self.fail(row.line, "not imported, the same days kept changing during the import")
+
+    def insert_chunk(self, chunk: list[ImportRow]):
+        new_rows = []
+        for row in chunk:
+            if row.error:
+                self.fail(row.line, row.error)
+            elif row.day_key not in self.day_ids and row.day is not None:
+                self.day_ids[row.day_key] = None
+                new_rows.append(row)
+        days = self.validate_days(new_rows)
+
+        effect_rows = [(row, effect) for row in chunk if not row.error for effect in row.effects]
+        effects = validate(effects_adapter, [
+            {**effect, "foreign_key": 1} if isinstance(effect, dict) else effect for _, effect in effect_rows
+        ])
+        # effects of days created in this chunk go straight into the new day's aggregate columns
+        totals = defaultdict(lambda: [0, 0])
+        new_effects = []
+        for (row, _), effect in zip(effect_rows, effects):
+            if isinstance(effect, Exception):
+                self.fail(row.line, effect)
+            elif effect.time is None:
+                # the request model defaults it but the effect table does not accept a missing time
+                self.fail(row.line, "time: Field required")
+            elif row.day_key not in self.day_ids or (self.day_ids[row.day_key] is None and row.day_key not in days):
+                self.fail(row.line, "the day of this effect was not imported")
+            else:
+                totals[row.day_key][0] += 1
+                totals[row.day_key][1] += effect.rate
+                new_effects.append((row.day_key, effect))
+
+        if days:
+            values = [
+                {**day.model_dump(), "owner": self.owner, "effect_count": totals[key][0], "effect_rate_sum": totals[key][1]}
+                for key, day in days.items()
+            ]
+            # RETURNING in parameter order makes sqlite insert row by row, the new ids are looked up by the unique date instead
+            self.db.connection().execute(insert(Day.__table__), values)
+            keys = {day.date: key for key, day in days.items()}
+            new_ids = []
+            for day_id, date in self.db.query(Day.id, Day.date).filter(Day.owner == self.owner).filter(Day.date.in_(keys)):
+                self.day_ids[keys[date]] = day_id
+                new_ids.append(day_id)
+            add_days_to_months(self.db, self.db.query(Day).filter(Day.owner == self.owner).filter(Day.id.in_(new_ids)))
+            self.days += len(new_ids)
+        if new_effects:
+            # RETURNING turns the executemany into multi-row INSERTs, fts5 flushes its pending terms once per statement
+            # and a row-by-row executemany makes the effect_fts trigger about ten times slower
+            self.db.connection().execute(insert(Effect.__table__).returning(Effect.id), [
+                {**effect.model_dump(), "foreign_key": self.day_ids[key], "owner": self.owner} for key, effect in new_effects
+            ])
+            # days from earlier chunks already exist, their aggregates are moved the same way a batch create does
+            add_effect_totals(self.db, self.owner, {
+                self.day_ids[key]: totals[key] for key in {key for key, _ in new_effects} if key not in days
+            })
+            self.effects += len(new_effects)
+
+    def validate_days(self, rows: list[ImportRow]) -> dict:
+        candidates = []
+        for row, day in zip(rows, validate(days_adapter, [row.day for row in rows])):
+            if isinstance(day, Exception):
+                self.fail(row.line, day)
+            else:
+                candidates.append((row, day))
+        taken = {
+            day.date for day in
+            self.db.query(Day.date).filter(Day.owner == self.owner).filter(Day.date.in_({day.date for _, day in candidates}))
+        }
+        days = {}
+        for row, day in candidates:
+            if day.date in taken:
+                self.fail(row.line, f"a day for {day.date} already exists")
+                continue
+            taken.add(day.date)
+            days[row.day_key] = day
+        return days
+
+
+def import_rows(file, import_format: str):
+    bad_lines = set()
+    stream = decoded_lines(file, bad_lines)
+    return csv_rows(stream, bad_lines) if import_format == "csv" else jsonl_rows(stream, bad_lines)
@@ -0,0 +1,205 @@
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds, a last implicit bucket catches everything slower (+Inf)
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "sql_time", "slow_queries", "statements")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slow_queries = 0
+        self.statements = Counter()
+
+
+# sync routes run in a worker thread with a copy of this context, the copy still points at the same RequestStats
+current_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("current_request", default=None)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "duration", "queries", "sql_time", "slow_queries", "n_plus_one")
+
+    def __init__(self):
+        self.buckets = [0] * (len(latency_buckets) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slow_queries = 0
+        self.n_plus_one = 0
+
+
+def route_template(scope) -> str:
+    # the template ("/days/id/{day_id}") instead of the path keeps one series per route
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (method, route template, status) -> RouteMetrics
+        self.routes = defaultdict(RouteMetrics)
+
+    def record(self, method: str, route: str, status: int, duration: float, stats: RequestStats):
+        repeated = 0
+        if stats.statements:
+            statement, repeated = stats.statements.most_common(1)[0]
+            if repeated >= settings.n_plus_one_threshold:
+                logger.warning("possible N+1 on %s %s: the same statement ran %d times: %s", method, route, repeated,
+                               statement[:500])
+        with self.lock:
+            metrics = self.routes[method, route, status]
+            metrics.buckets[bisect_left(latency_buckets, duration)] += 1
+            metrics.count += 1
+            metrics.duration += duration
+            metrics.queries += stats.queries
+            metrics.sql_time += stats.sql_time
+            metrics.slow_queries += stats.slow_queries
+            metrics.n_plus_one += repeated >= settings.n_plus_one_threshold
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {key: (list(value.buckets), value.count, value.duration, value.queries, value.sql_time,
+                          value.slow_queries, value.n_plus_one) for key, value in self.routes.items()}
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    # a plain ASGI middleware: BaseHTTPMiddleware would add a task and a body copy to every request
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            metrics.record(scope["method"], route_template(scope), status_code, time.perf_counter() - start, stats)
+
+
+def track_queries(engine: Engine):
+    # queries outside of a request (startup, migrations, scripts) find no RequestStats and are not counted
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+        stats.queries += 1
+        stats.sql_time += elapsed
+        stats.statements[statement] += 1
+        if elapsed * 1000 >= settings.slow_query_ms:
+            stats.slow_queries += 1
+            logger.warning("slow query (%.0f ms) on %s %s: %s", elapsed * 1000, stats.scope["method"],
+                           route_template(stats.scope), statement[:500])
+
+
+def label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    snapshot = metrics.snapshot()
+    lines = [
+        "# HELP mymood_http_request_duration_seconds Request latency by route template.",
+        "# TYPE mymood_http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), (buckets, count, duration, *_) in snapshot.items():
+        labels = f'method="{label(method)}",route="{label(route)}",status="{status}"'
+        cumulative = 0
+        for bound, bucket in zip((*latency_buckets, "+Inf"), buckets):
+            cumulative += bucket
+            lines.append(f'mymood_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"mymood_http_request_duration_seconds_sum{{{labels}}} {duration}")
+        lines.append(f"mymood_http_request_duration_seconds_count{{{labels}}} {count}")
+    counters = [
+        ("mymood_sql_queries_total", "SQL statements run while serving the route.", 3),
+        ("mymood_sql_duration_seconds_total", "Time spent in SQL statements while serving the route.", 4),
+        ("mymood_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", 5),
+        ("mymood_n_plus_one_requests_total", "Requests that ran one statement at least N_PLUS_ONE_THRESHOLD times.", 6),
+    ]
+    for name, description, position in counters:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+        for (method, route, status), values in snapshot.items():
+            lines.append(f'{name}{{method="{label(method)}",route="{label(route)}",status="{status}"}} {values[position]}')
+    return "\n".join(lines) + "\n"
+
+
+def percentile_ms(buckets: list[int], count: int, fraction: float) -> float | None:
+    # upper bound of the bucket the percentile falls into, None when it is past the last bound
+    rank = fraction * count
+    cumulative = 0
+    for bound, bucket in zip(latency_buckets, buckets):
+        cumulative += bucket
+        if cumulative >= rank:
+            return bound * 1000
+    return None
+
+
+def metrics_summary() -> list[dict]:
+    routes = defaultdict(lambda: {"buckets": [0] * (len(latency_buckets) + 1), "statuses": {}, "count": 0, "duration": 0.0,
+                                  "queries": 0, "sql_time": 0.0, "slow_queries": 0, "n_plus_one": 0})
+    for (method, route, status), (buckets, count, duration, queries, sql_time, slow, n_plus_one) in metrics.snapshot().items():
+        total = routes[method, route]
+        total["buckets"] = [a + b for a, b in zip(total["buckets"], buckets)]
+        total["statuses"][status] = count
+        total["count"] += count
+        total["duration"] += duration
+        total["queries"] += queries
+        total["sql_time"] += sql_time
+        total["slow_queries"] += slow
+        total["n_plus_one"] += n_plus_one
+    summary = [
+        {
+            "method": method,
+            "route": route,
+            "requests": total["count"],
+            "statuses": total["statuses"],
+            "mean_ms": total["duration"] / total["count"] * 1000,
+            "p50_ms": percentile_ms(total["buckets"], total["count"], 0.5),
+            "p95_ms": percentile_ms(total["buckets"], total["count"], 0.95),
+            "p99_ms": percentile_ms(total["buckets"], total["count"], 0.99),
+            "queries_per_request": total["queries"] / total["count"],
+            "sql_ms_per_request": total["sql_time"] / total["count"] * 1000,
+            "slow_queries": total["slow_queries"],
+            "n_plus_one_requests": total["n_plus_one"],
+        }
+        for (method, route), total in routes.items()
+    ]
+    return sorted(summary, key=lambda route: route["mean_ms"] * route["requests"], reverse=True)
@@ -0,0 +1,60 @@
+from fastapi import Query
+from pydantic import BaseModel
+from sqlalchemy import delete, false, update
+from sqlmodel import Session, func
+
+from models.batch import BatchItemResult
+from utils.search import match_expression, matching_ids
+
+
+class ModerationParams(BaseModel):
+    approved: bool | None
+    done: bool | None
+    user_id: int | None
+    search: str | None
+
+
+def moderation_params(approved: bool | None = Query(default=None), done: bool | None = Query(default=None),
+                      user_id: int | None = Query(default=None, gt=0),
+                      search: str | None = Query(default=None, min_length=1, max_length=100)):
+    return ModerationParams(approved=approved, done=done, user_id=user_id, search=search)
+
+
+def filter_reports(query, model, params: ModerationParams):
+    if params.approved is not None:
+        query = query.filter(model.approved == params.approved)
+    if params.done is not None:
+        query = query.filter(model.done == params.done)
+    if params.user_id is not None:
+        query = query.filter(model.user_id == params.user_id)
+    if params.search:
+        expression = match_expression(params.search)
+        query = query.filter(model.id.in_(matching_ids(model, expression)) if expression else false())
+    return query
+
+
+def report_counts(db: Session, model, params: ModerationParams) -> dict:
+    # one GROUP BY over (approved, done), the totals are folded together from its at most four rows
+    query = filter_reports(db.query(model.approved, model.done, func.count()), model, params)
+    counts = {"total": 0, "approved": 0, "pending": 0, "done": 0, "open": 0}
+    for approved, done, count in query.group_by(model.approved, model.done):
+        counts["total"] += count
+        counts["approved" if approved else "pending"] += count
+        counts["done" if done else "open"] += count
+    return counts
+
+
+def update_reports(db: Session, model, ids: list[int], **values) -> set[int]:
+    # a single UPDATE ... WHERE id IN, RETURNING tells which of the ids actually existed
+    return set(db.scalars(update(model).where(model.id.in_(set(ids))).values(**values).returning(model.id)))
+
+
+def delete_reports(db: Session, model, ids: list[int]) -> set[int]:
+    return set(db.scalars(delete(model).where(model.id.in_(set(ids))).returning(model.id)))
+
+
+def batch_results(ids: list[int], found: set[int], found_status: str) -> list[BatchItemResult]:
+    return [
+        BatchItemResult(index=index, status=found_status if report_id in found else "not_found", id=report_id)
+        for index, report_id in enumerate(ids)
+    ]
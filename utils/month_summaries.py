@@ -0,0 +1,93 @@
+from sqlalchemy import delete, except_, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, func
+
+from models.days import Day
+from models.summaries import MonthSummary
+
+# monthsummary holds per (owner, "YYYY-MM") sums of the day rows and of their effect aggregates.
+# every day/effect write path adds its delta in the same transaction, rebuild_month_summaries recomputes it all
+summed_columns = ["day_count", "rate_sum", "red_sum", "green_sum", "blue_sum", "effect_count", "effect_rate_sum"]
+
+month_of_day = func.strftime("%Y-%m", Day.date)
+
+
+def month_totals(days: bool = True) -> list:
+    # select list in summed_columns order over whatever day rows it is applied to
+    zero = literal(0)
+    return [
+        func.count() if days else zero,
+        func.sum(Day.rate) if days else zero,
+        func.sum(Day.red) if days else zero,
+        func.sum(Day.green) if days else zero,
+        func.sum(Day.blue) if days else zero,
+        func.sum(Day.effect_count),
+        func.sum(Day.effect_rate_sum),
+    ]
+
+
+def upsert_months(db, rows):
+    # rows selects (owner, period, *summed_columns) deltas, a month that already exists is added to
+    statement = insert(MonthSummary).from_select(["owner", "period", *summed_columns], rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["owner", "period"],
+        set_={name: getattr(MonthSummary, name) + getattr(statement.excluded, name) for name in summed_columns},
+    )
+    db.execute(statement)
+
+
+def add_days_to_months(db: Session, day_query, sign: int = 1, days: bool = True):
+    # day_query is a Day query filtered to the changed rows; sign=-1 takes them out before they change or go away,
+    # days=False moves only their effect aggregates
+    rows = day_query.with_entities(Day.owner, month_of_day, *[sign * total for total in month_totals(days)])\
+        .group_by(Day.owner, month_of_day)
+    upsert_months(db, rows.statement)
+
+
+def remove_days_from_months(db: Session, owner: int, day_query):
+    add_days_to_months(db, day_query, -1)
+    db.execute(delete(MonthSummary).where(MonthSummary.owner == owner).where(MonthSummary.day_count == 0))
+
+
+def add_effects_to_month(db: Session, owner: int, day_id: int, count: int, rate_sum: int):
+    rows = select(Day.owner, month_of_day, *[literal(0)] * 5, literal(count), literal(rate_sum))\
+        .where(Day.owner == owner).where(Day.id == day_id)
+    upsert_months(db, rows)
+
+
+def clear_months(db: Session, owner: int, effects_only: bool = False):
+    months = db.query(MonthSummary).filter(MonthSummary.owner == owner)
+    if effects_only:
+        months.update({MonthSummary.effect_count: 0, MonthSummary.effect_rate_sum: 0}, synchronize_session=False)
+    else:
+        months.delete(synchronize_session=False)
+
+
+def fresh_month_summaries():
+    return select(Day.owner, month_of_day, *month_totals()).group_by(Day.owner, month_of_day)
+
+
+def rebuild_month_summaries(db) -> int:
+    # db is a Session or a Connection, the migration that adds the table runs this too
+    db.execute(delete(MonthSummary))
+    return db.execute(insert(MonthSummary).from_select(["owner", "period", *summed_columns], fresh_month_summaries())).rowcount
+
+
+def find_stale_month_summaries(db) -> tuple[list, list]:
+    # (recomputed rows missing from the table, stored rows that no recomputation produces)
+    stored = select(MonthSummary.owner, MonthSummary.period, *[getattr(MonthSummary, name) for name in summed_columns])
+    missing = db.execute(select(except_(fresh_month_summaries(), stored).subquery())).all()
+    wrong = db.execute(select(except_(stored, fresh_month_summaries()).subquery())).all()
+    return missing, wrong
+
+
+def month_summary(row: MonthSummary) -> dict:
+    return {
+        "period": row.period,
+        "days": row.day_count,
+        "rate": row.rate_sum / row.day_count,
+        "color": {"red": row.red_sum / row.day_count, "green": row.green_sum / row.day_count,
+                  "blue": row.blue_sum / row.day_count},
+        "effects": row.effect_count,
+        "effect_rate": row.effect_rate_sum / row.effect_count if row.effect_count else None,
+    }
@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+from sqlalchemy import Boolean, DateTime, bindparam, select, text
+from sqlmodel import Session
+
+from models.days import Day
+from models.effects import Effect
+from utils.pagination import model_columns, row_to_dict
+from utils.responses import dump_json
+
+
+def json_value(column) -> str:
+    # a column written the way the API serializes it, so the json built by sqlite matches the python encoder
+    name = f"{column.table.name}.{column.key}"
+    # unwraps type decorators such as sqlmodel's UTCDateTime
+    column_type = getattr(column.type, "impl_instance", column.type)
+    if isinstance(column_type, Boolean):
+        return f"json(CASE WHEN {name} THEN 'true' ELSE 'false' END)"
+    if isinstance(column_type, DateTime):
+        # stored as "YYYY-MM-DD HH:MM:SS.ffffff" in utc, pydantic writes it as "YYYY-MM-DDTHH:MM:SS.ffffffZ"
+        # and leaves out a zero fraction
+        return f"replace(replace({name}, ' ', 'T'), '.000000', '') || 'Z'"
+    return name
+
+
+def json_object_sql(model) -> str:
+    columns = [model.__table__.c[name] for name in model.model_fields]
+    return "json_object(" + ", ".join(f"'{column.key}', {json_value(column)}" for column in columns) + ")"
+
+
+# one row per day with its effects already nested, the effects come from the (owner, foreign_key) index per day
+# instead of repeating every day column on each of its effects in a join
+overview_sql = text(
+    f"SELECT json_object('day', {json_object_sql(Day)}, 'effects', json(("
+    f"SELECT json_group_array({json_object_sql(Effect)}) FROM ("
+    f"SELECT * FROM effect WHERE effect.owner = day.owner AND effect.foreign_key = day.id ORDER BY effect.id"
+    f") AS effect))) "
+    f"FROM day WHERE day.owner = :owner AND day.id IN :day_ids ORDER BY day.id"
+).bindparams(bindparam("day_ids", expanding=True))
+
+
+def sqlite_overview_json(db: Session, owner: int, day_ids: set[int]) -> bytes:
+    days = db.scalars(overview_sql, {"owner": owner, "day_ids": list(day_ids)})
+    return b'{"data":[' + ",".join(days).encode() + b"]}"
+
+
+def grouped_overview_json(db: Session, owner: int, day_ids: set[int]) -> bytes:
+    # other databases: one query for the days, one for their effects, grouped in a single pass
+    day_columns = model_columns(Day)
+    effect_columns = model_columns(Effect)
+    day_dict = row_to_dict(day_columns)
+    effect_dict = row_to_dict(effect_columns)
+    effects = defaultdict(list)
+    effect_rows = db.execute(
+        select(*effect_columns).where(Effect.owner == owner).where(Effect.foreign_key.in_(day_ids)).order_by(Effect.id)
+    )
+    for row in effect_rows:
+        effects[row.foreign_key].append(effect_dict(row))
+    days = db.execute(select(*day_columns).where(Day.owner == owner).where(Day.id.in_(day_ids)).order_by(Day.id))
+    return dump_json({"data": [{"day": day_dict(row), "effects": effects[row.id]} for row in days]})
+
+
+def days_overview_json(db: Session, owner: int, day_ids: set[int]) -> bytes:
+    if not day_ids:
+        return b'{"data":[]}'
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_overview_json(db, owner, day_ids)
+    return grouped_overview_json(db, owner, day_ids)
@@ -0,0 +1,69 @@
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlmodel import Session
+
+from utils.responses import dump_json
+
+next_cursor_header = "X-Next-Cursor"
+
+stream_chunk_size = 500
+
+# pages of the search endpoints, which never returned everything at once
+default_page_size = 100
+
+
+class PageParams(BaseModel):
+    limit: int | None
+    cursor: int | None
+    stream: bool
+
+
+def page_params(limit: int | None = Query(default=None, gt=0, le=1000), cursor: int | None = Query(default=None, gt=0),
+                stream: bool = Query(default=False)):
+    return PageParams(limit=limit, cursor=cursor, stream=stream)
+
+
+def first_column(row):
+    return row[0]
+
+
+def model_columns(model) -> list:
+    # every column of a table model, in the order its instances serialize, selected as plain rows so a list endpoint
+    # skips hydrating (and identity-mapping) an ORM instance per row
+    return [getattr(model, name) for name in model.model_fields]
+
+
+def row_to_dict(columns: list):
+    # paginate appends its key column to each row, zip stops before it
+    names = [column.key for column in columns]
+    return lambda row: dict(zip(names, row))
+
+
+def paginate(db: Session, query, key, page: PageParams, response: Response, serialize=first_column):
+    # keyset pagination: the key column is appended to every row so the last one becomes the next cursor. without a
+    # limit the whole list comes back in one response, the way the list endpoints answered before they had pages
+    query = query.add_columns(key).order_by(key)
+    if page.cursor is not None:
+        query = query.filter(key > page.cursor)
+    if page.stream:
+        return stream_ndjson(db, query.statement, serialize)
+    if page.limit is None:
+        return [serialize(row) for row in db.execute(query.statement)]
+    rows = db.execute(query.limit(page.limit + 1).statement).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[next_cursor_header] = str(rows[-1][-1])
+    return [serialize(row) for row in rows]
+
+
+def stream_ndjson(db: Session, statement, serialize=first_column):
+    # the request session may be closed before the body is sent, so the stream reads through its own session
+    bind = db.get_bind()
+
+    def lines():
+        with Session(bind) as stream_db:
+            for row in stream_db.execute(statement.execution_options(yield_per=stream_chunk_size)):
+                yield dump_json(serialize(row)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,3 +1,52 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+from utils.config import settings
+
+# pinning min and max to the configured rounds makes verify_and_update hand back a rehash whenever they change
+bcrypt_context = CryptContext(
+    schemes=['bcrypt'],
+    deprecated='auto',
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+_hash_pool: ProcessPoolExecutor | None = None
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.hash_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown()
+        _hash_pool = None
+
+
+def _hash(password: str) -> str:
+    return bcrypt_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return bcrypt_context.verify_and_update(password, hashed_password)
+
+
+def hash_password(password: str) -> str:
+    return get_hash_pool().submit(_hash, password).result()
+
+
+def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    # returns (valid, new_hash), new_hash is set when the stored hash was made with other rounds
+    return get_hash_pool().submit(_verify_and_update, password, hashed_password).result()
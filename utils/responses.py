@@ -0,0 +1,36 @@
+import pydantic_core
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_fallback(value):
+    # orjson handles dicts, lists, dates and numbers itself, models and anything rarer go through fastapi's encoder
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return jsonable_encoder(value)
+
+
+def dump_json(content) -> bytes:
+    # both write datetimes the way pydantic does ("...Z" for utc), so the body does not depend on which one is installed
+    if orjson is not None:
+        return orjson.dumps(content, default=encode_fallback, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return pydantic_core.to_json(content, fallback=encode_fallback)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+
+def json_response(content, response: Response | None = None) -> FastJSONResponse:
+    # a returned Response skips fastapi's response_model validation and jsonable_encoder pass, headers set on the
+    # injected response (cursor, etag) are not merged into it by fastapi and are carried over here
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
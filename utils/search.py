@@ -0,0 +1,88 @@
+import re
+
+from fastapi import Response
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection
+
+from utils.pagination import PageParams, default_page_size, first_column, next_cursor_header, stream_ndjson
+
+# external content FTS5 indexes, the triggers below keep them in step with their tables.
+# effect_fts also indexes the owner so a per-user search intersects posting lists instead of filtering matches
+fts_indexes = {
+    "effect": ("effect_fts", ["description", "owner"]),
+    "bug": ("bug_fts", ["title", "description"]),
+    "suggestion": ("suggestion_fts", ["description"]),
+}
+
+search_term_pattern = re.compile(r"\w+\*?")
+
+
+def create_fts_indexes(conn: Connection):
+    for source, (name, columns) in fts_indexes.items():
+        names = ", ".join(columns)
+        new_values = ", ".join(f"new.{name}" for name in columns)
+        old_values = ", ".join(f"old.{name}" for name in columns)
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({names}, content='{source}', content_rowid='id', "
+            f"tokenize='porter unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {name}(rowid, {names}) VALUES (new.id, {new_values}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {name}({name}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {names} ON {source} BEGIN "
+            f"INSERT INTO {name}({name}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {name}(rowid, {names}) VALUES (new.id, {new_values}); END"
+        ))
+        conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+
+
+def match_expression(search: str, column_name: str | None = None) -> str | None:
+    # user input never reaches the FTS5 query syntax directly, every word becomes a quoted term (prefix with a trailing *)
+    terms = [
+        f'"{term.rstrip("*")}"*' if term.endswith("*") else f'"{term}"'
+        for term in search_term_pattern.findall(search)
+    ]
+    if not terms:
+        return None
+    expression = " AND ".join(terms)
+    return f"{column_name}: ({expression})" if column_name else expression
+
+
+def fts_table(model):
+    name = fts_indexes[model.__tablename__][0]
+    return table(name, column("rowid")), literal_column(name)
+
+
+def matching_ids(model, expression: str):
+    fts, fts_column = fts_table(model)
+    return select(fts.c.rowid).where(fts_column.match(expression))
+
+
+def search_matches(model, expression: str):
+    # (rowid, rank) of every row matching the FTS expression, lower rank is a better match
+    fts, fts_column = fts_table(model)
+    return select(fts.c.rowid.label("id"), func.bm25(fts_column).label("rank")).where(fts_column.match(expression))
+
+
+def owner_match_expression(owner: int, search: str) -> str | None:
+    expression = match_expression(search, "description")
+    return expression and f'owner: "{owner}" AND {expression}'
+
+
+def ranked_search(db, query, page: PageParams, response: Response, serialize=first_column):
+    # ranked results have no stable key to seek on, so the cursor here is the offset of the next page
+    if page.stream:
+        return stream_ndjson(db, query.statement, serialize)
+    offset = page.cursor or 0
+    limit = page.limit or default_page_size
+    rows = db.execute(query.offset(offset).limit(limit + 1).statement).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[next_cursor_header] = str(offset + limit)
+    return [serialize(row) for row in rows]
@@ -0,0 +1,98 @@
+import datetime
+
+from sqlalchemy import case, cast, Integer, select
+from sqlmodel import Session, func
+
+from models.days import Day
+from models.effects import Effect
+from models.summaries import MonthSummary
+from utils.date_utils import utcnow
+from utils.month_summaries import month_summary
+
+# every statistic is an aggregate or window query over a handful of columns, no Day/Effect objects are loaded.
+# monthly figures come straight from the maintained monthsummary rows
+
+
+def period_averages(db: Session, owner: int, period) -> list[dict]:
+    statement = (
+        select(period, func.count(), func.avg(Day.rate), func.avg(Day.red), func.avg(Day.green), func.avg(Day.blue))
+        .where(Day.owner == owner)
+        .group_by(period)
+        .order_by(period)
+    )
+    return [
+        {"period": key, "days": count, "rate": rate, "color": {"red": red, "green": green, "blue": blue}}
+        for key, count, rate, red, green, blue in db.execute(statement)
+    ]
+
+
+def average_color(months: list[MonthSummary]) -> dict | None:
+    days = sum(month.day_count for month in months)
+    if not days:
+        return None
+    return {
+        "red": round(sum(month.red_sum for month in months) / days),
+        "green": round(sum(month.green_sum for month in months) / days),
+        "blue": round(sum(month.blue_sum for month in months) / days),
+    }
+
+
+def rolling_averages(db: Session, owner: int, since: datetime.date) -> list[dict]:
+    # the windows cover calendar days, a missing day shortens the window instead of pulling in older entries.
+    # rows up to 29 days before `since` are read only to fill the first windows
+    day_number = func.julianday(Day.date)
+    windows = (
+        select(
+            Day.date.label("date"),
+            func.avg(Day.rate).over(order_by=day_number, range_=(-6, 0)).label("rate_7d"),
+            func.avg(Day.rate).over(order_by=day_number, range_=(-29, 0)).label("rate_30d"),
+        )
+        .where(Day.owner == owner)
+        .where(Day.date >= since - datetime.timedelta(days=29))
+        .subquery()
+    )
+    statement = select(windows).where(windows.c.date >= since).order_by(windows.c.date)
+    return [{"date": date, "rate_7d": week, "rate_30d": month} for date, week, month in db.execute(statement)]
+
+
+def streaks(db: Session, owner: int) -> dict:
+    # consecutive dates share the same (day number - row number), so each group is one unbroken streak
+    islands = (
+        select(Day.date.label("date"), (func.julianday(Day.date) - func.row_number().over(order_by=Day.date)).label("island"))
+        .where(Day.owner == owner)
+        .subquery()
+    )
+    statement = select(func.max(islands.c.date), func.count()).group_by(islands.c.island).order_by(func.max(islands.c.date).desc())
+    rows = db.execute(statement).all()
+    if not rows:
+        return {"current": 0, "longest": 0}
+    latest_end, latest_length = rows[0]
+    return {
+        "current": latest_length if latest_end >= utcnow().date() - datetime.timedelta(days=1) else 0,
+        "longest": max(length for _, length in rows),
+    }
+
+
+def effect_rates_by_hour(db: Session, owner: int) -> list[dict]:
+    # Effect.time is "H:MM" or "HH:MM", everything before the colon is the hour
+    hour = cast(func.substr(Effect.time, 1, func.instr(Effect.time, ":") - 1), Integer)
+    statement = (
+        select(hour, func.count(), func.avg(Effect.rate), *[func.sum(case((Effect.rate == rate, 1), else_=0)) for rate in range(5)])
+        .where(Effect.owner == owner)
+        .where(Effect.time.is_not(None))
+        .group_by(hour)
+        .order_by(hour)
+    )
+    return [{"hour": hour, "effects": count, "rate": rate, "rates": list(rates)} for hour, count, rate, *rates in db.execute(statement)]
+
+
+def mood_stats(db: Session, owner: int, rolling_days: int) -> dict:
+    months = db.query(MonthSummary).filter(MonthSummary.owner == owner).order_by(MonthSummary.period).all()
+    return {
+        "weekly": period_averages(db, owner, func.date(Day.date, "weekday 0", "-6 days")),
+        "monthly": [month_summary(month) for month in months],
+        "color": average_color(months),
+        "rolling": rolling_averages(db, owner, utcnow().date() - datetime.timedelta(days=rolling_days - 1)),
+        "streaks": streaks(db, owner),
+        "effects_by_hour": effect_rates_by_hour(db, owner),
+    }
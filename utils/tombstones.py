@@ -0,0 +1,12 @@
+from sqlalchemy import DateTime, insert, literal
+from sqlmodel import Session
+
+from models.tombstones import Tombstone
+from utils.date_utils import utcnow
+
+
+def record_tombstones(db: Session, query):
+    # query is the Day/Effect query about to be deleted, its rows are copied into the tombstone table first
+    model = query.column_descriptions[0]["entity"]
+    rows = query.with_entities(model.owner, model.id, literal(model.__tablename__), literal(utcnow(), DateTime))
+    db.execute(insert(Tombstone).from_select(["owner", "record_id", "kind", "deleted_at"], rows.statement))